@@ -0,0 +1,116 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from typing import Callable, Iterable, Iterator, TextIO
+
+import batch_hashing
+from login_system import LoginSystem
+
+# Number of hashed accounts between two progress reports
+DEFAULT_REPORT_EVERY = 100000
+
+
+def read_csv_accounts(file: TextIO) -> Iterator[tuple[str, str]]:
+    """
+    Yields (username, password) pairs from a CSV stream with a header row containing "username" and "password"
+    columns.
+    """
+    for row in csv.DictReader(file):
+        yield row['username'], row['password']
+
+
+def read_jsonl_accounts(file: TextIO) -> Iterator[tuple[str, str]]:
+    """
+    Yields (username, password) pairs from a JSON Lines stream of {"username": ..., "password": ...} objects.
+    Blank lines are skipped.
+    """
+    for line in file:
+        if line.strip():
+            row = json.loads(line)
+            yield row['username'], row['password']
+
+
+def import_accounts(system: LoginSystem, accounts: Iterable[tuple[str, str]],
+                    progress: Callable[[int, int, float], None] | None = None,
+                    report_every: int = DEFAULT_REPORT_EVERY) -> tuple[int, float]:
+    """
+    Creates an account in <system> for every (username, password) pair in <accounts>, like create_new_account, and
+    returns a tuple in the form (number of accounts imported, elapsed seconds).
+
+    Every username is checked for duplicates (within <accounts> and against <system>) BEFORE anything is hashed, and
+    nothing is imported if there are any. The passwords are then hashed in parallel batches with
+    batch_hashing.hash_many (salted and iterated if system.iterations is set) and the accounts are inserted in a
+    single pass at the end.
+
+    If given, progress(hashed so far, total, elapsed seconds) is called every report_every accounts and once at the
+    end.
+    """
+    if report_every < 1:
+        raise ValueError('Progress must be reported at least every 1 account')
+    start = time.perf_counter()
+    accounts = list(accounts)
+
+    seen = set()
+    duplicates = []
+    for username, _ in accounts:
+        if username in seen or system.check_existing_username(username):
+            duplicates.append(username)
+        seen.add(username)
+    if duplicates:
+        raise ValueError(f'{len(duplicates)} duplicate username(s), e.g. {duplicates[:5]}')
+
+    hashed_passwords = []
+    for hashed_password in batch_hashing.hash_many((password for _, password in accounts),
+                                                     iterations=system.iterations):
+        hashed_passwords.append(hashed_password)
+        if progress is not None and len(hashed_passwords) % report_every == 0:
+            progress(len(hashed_passwords), len(accounts), time.perf_counter() - start)
+
+    system.add_hashed_accounts(zip((username for username, _ in accounts), hashed_passwords))
+
+    elapsed = time.perf_counter() - start
+    if progress is not None:
+        progress(len(accounts), len(accounts), elapsed)
+    return len(accounts), elapsed
+
+
+def _print_progress(done: int, total: int, elapsed: float) -> None:
+    """
+    Prints an import progress report with the hashing throughput to stderr.
+    """
+    rate = done / elapsed if elapsed > 0 else float('inf')
+    print(f'{done}/{total} accounts ({rate:.0f} accounts/s)', file=sys.stderr)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Command-line entry point: imports a CSV or JSONL file of accounts into a persistent DigestIndex.
+
+    Returns the exit status (1 if the import was rejected, 0 otherwise).
+    """
+    parser = argparse.ArgumentParser(prog='python -m account_import', description='Bulk import accounts.')
+    parser.add_argument('accounts', help='CSV (username,password header) or JSONL file of accounts')
+    parser.add_argument('index', help='digest index file to import into (created if missing)')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='input format (default: from the file extension)')
+    parser.add_argument('--report-every', type=int, default=DEFAULT_REPORT_EVERY, help='accounts between reports')
+    args = parser.parse_args(argv)
+
+    input_format = args.format or ('jsonl' if args.accounts.endswith(('.jsonl', '.json')) else 'csv')
+    reader = read_jsonl_accounts if input_format == 'jsonl' else read_csv_accounts
+
+    system = LoginSystem(index_path=args.index)
+    try:
+        with open(args.accounts, newline='', encoding='utf-8') as file:
+            import_accounts(system, reader(file), _print_progress, args.report_every)
+    except ValueError as error:
+        print(f'Import rejected: {error}', file=sys.stderr)
+        return 1
+    finally:
+        system.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
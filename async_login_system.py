@@ -0,0 +1,125 @@
+import asyncio
+from concurrent.futures import Executor
+
+import hash_main
+import password_hashing
+from login_system import LoginSystem
+
+# Default maximum number of hash jobs running in the executor at once
+DEFAULT_MAX_IN_FLIGHT = 8
+
+
+class AsyncLoginSystem:
+    """
+    An asyncio front end for a LoginSystem that never hashes on the event loop.
+
+    Every hash runs on <executor> (the event loop's default executor if None; a ProcessPoolExecutor lets hashing use
+    other cores), and at most max_in_flight hash jobs run at once. Identical concurrent requests are coalesced: if a
+    password is already being hashed, later requests for it wait for the same job instead of starting another one.
+    If the LoginSystem stores salted passwords (system.iterations is set), the salted hashing and verification run on
+    the executor too, and old unsalted hashes are upgraded on the next successful login, like LoginSystem does.
+
+    === REPRESENTATION INVARIANTS ===
+    Every task in _pending is hashing the password it is keyed by and has not finished yet.
+    """
+
+    system: LoginSystem
+    executor: Executor | None
+    max_in_flight: int
+    _semaphore: asyncio.Semaphore
+    _pending: dict[str, asyncio.Task]
+
+    def __init__(self, system: LoginSystem | None = None, executor: Executor | None = None,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> None:
+        """
+        Creates an AsyncLoginSystem instance on top of <system> (a new, empty LoginSystem if None).
+        """
+        self.system = LoginSystem() if system is None else system
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._pending = {}
+
+    async def hash(self, password: str) -> str:
+        """
+        Returns hash_main.hash(password), computed on the executor and shared with any concurrent identical request.
+
+        Cancelling one caller does not cancel the shared job for the others.
+        """
+        task = self._pending.get(password)
+        if task is None:
+            task = asyncio.ensure_future(self._run_hash(password))
+            self._pending[password] = task
+            task.add_done_callback(lambda _: self._pending.pop(password, None))
+        return await asyncio.shield(task)
+
+    async def _run_hash(self, password: str) -> str:
+        """
+        Hashes <password> on the executor once a slot is free.
+        """
+        return await self._run(hash_main.hash, password)
+
+    async def _run(self, function, *arguments):
+        """
+        Returns function(*arguments), computed on the executor once a slot is free.
+        """
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, function, *arguments)
+
+    async def _hash_for_storage(self, password: str) -> str:
+        """
+        Returns the form of <password> the system stores: salted and iterated if system.iterations is set, otherwise
+        its plain hash.
+        """
+        if self.system.iterations is not None:
+            return await self._run(password_hashing.hash_password, password, self.system.iterations)
+        return await self.hash(password)
+
+    async def validate_password(self, username: str, password: str) -> bool:
+        """
+        Asynchronous LoginSystem.validate_password.
+
+        PRECONDITION: Username/password combination exists in the login system.
+        """
+        if self.system.iterations is None:
+            hashed_password = await self.hash(password)
+            return self.system.matches_hash(username, hashed_password)
+
+        stored = self.system.hash_map[username]
+        if not await self._run(password_hashing.verify_password, password, stored):
+            return False
+        if password_hashing.needs_rehash(stored, self.system.iterations):
+            rehashed = await self._hash_for_storage(password)
+            # Only replace the entry that was verified, never one changed while rehashing
+            if username in self.system.hash_map and self.system.hash_map[username] == stored:
+                self.system.hash_map[username] = rehashed
+        return True
+
+    async def create_new_account(self, username: str, password: str) -> None:
+        """
+        Asynchronous LoginSystem.create_new_account.
+        """
+        self.system.hash_map[username] = await self._hash_for_storage(password)
+
+    async def create_account_if_new(self, username: str, password: str) -> bool:
+        """
+        Creates a new account like create_new_account, unless the username is taken, and returns true if it was
+        created.
+
+        The username is checked again after the hash completes, with no await between that check and the insert, so
+        concurrent requests for the same username can never overwrite each other: exactly one of them creates it.
+        """
+        if self.system.check_existing_username(username):
+            return False
+        hashed_password = await self._hash_for_storage(password)
+        if self.system.check_existing_username(username):
+            return False
+        self.system.hash_map[username] = hashed_password
+        return True
+
+    def check_existing_username(self, username: str) -> bool:
+        """
+        Checks if the username already exists in the login system (no hashing involved, so no need to await).
+        """
+        return self.system.check_existing_username(username)
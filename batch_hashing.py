@@ -0,0 +1,103 @@
+import atexit
+import itertools
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+import hash_main
+import password_hashing
+
+# Number of messages sent to a worker process at a time
+DEFAULT_CHUNK_SIZE = 512
+
+# Batches with fewer messages than this are hashed in the calling process, where pool overhead would dominate
+DEFAULT_SERIAL_THRESHOLD = 2048
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers: int = 0
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Returns the long-lived process pool shared by every batch, creating it (one worker per core) on first use.
+    """
+    global _pool, _pool_workers
+    if _pool is None:
+        _pool_workers = os.cpu_count() or 1
+        _pool = ProcessPoolExecutor(max_workers=_pool_workers)
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """
+    Shuts down the shared process pool, if it was started. A new pool is created the next time one is needed.
+    """
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def hash_many(messages: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+              serial_threshold: int = DEFAULT_SERIAL_THRESHOLD, iterations: int | None = None) -> Iterator[str]:
+    """
+    Hashes every message in <messages> with hash_main.hash and returns an iterator over the hashes, in input order. If
+    <iterations> is given, every message is instead stored salted and iterated with password_hashing.hash_password.
+
+    Messages are dispatched to the shared process pool chunk_size at a time, and only a bounded number of chunks are
+    in flight at once, so results stream back while <messages> is still being read. If <messages> holds fewer than
+    serial_threshold messages, they are hashed in the calling process instead.
+
+    >>> list(hash_many(['a', 'A']))
+    ['0cc175b9c0f1b6a831c399e269772661', '7fc56270e7a70fa81a5935b72eacbe29']
+    """
+    # Checked here rather than in the generator so that the error is raised when hash_many is called
+    if chunk_size < 1:
+        raise ValueError('The chunk size must be at least 1')
+    return _hash_many(iter(messages), chunk_size, serial_threshold, iterations)
+
+
+def _hash_many(messages: Iterator[str], chunk_size: int, serial_threshold: int,
+               iterations: int | None) -> Iterator[str]:
+    """
+    Generator behind hash_many.
+    """
+    first_batch = list(itertools.islice(messages, serial_threshold))
+    if len(first_batch) < serial_threshold:
+        yield from _hash_chunk(first_batch, iterations)
+        return
+
+    pool = get_pool()
+    max_in_flight = 2 * _pool_workers
+    in_flight: deque[Future] = deque()
+    for chunk in _chunk(itertools.chain(first_batch, messages), chunk_size):
+        if len(in_flight) >= max_in_flight:
+            yield from in_flight.popleft().result()
+        in_flight.append(pool.submit(_hash_chunk, chunk, iterations))
+
+    while in_flight:
+        yield from in_flight.popleft().result()
+
+
+def _chunk(messages: Iterator[str], chunk_size: int) -> Iterator[list[str]]:
+    """
+    Yields consecutive lists of up to <chunk_size> messages.
+    """
+    chunk = list(itertools.islice(messages, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(messages, chunk_size))
+
+
+def _hash_chunk(chunk: list[str], iterations: int | None = None) -> list[str]:
+    """
+    Returns the hashes of every message in <chunk>, salted and iterated if <iterations> is given. Runs inside a worker
+    process.
+    """
+    if iterations is not None:
+        return [password_hashing.hash_password(message, iterations) for message in chunk]
+    return [hash_main.hash(message) for message in chunk]
@@ -0,0 +1,147 @@
+import argparse
+import json
+import sys
+import time
+
+import hash_main
+from hasher import MD5Hasher
+from login_system import LoginSystem
+
+# Padding-boundary cases from test_hashing.py, as numbers of bits (every one is a whole number of characters)
+BOUNDARY_BITS = [0, 8, 448, 456, 504, 512, 1560]
+
+# Input sizes for the throughput benchmarks, from 1 KB to 100 MB
+THROUGHPUT_SIZES = {'1KB': 1000, '10KB': 10 ** 4, '100KB': 10 ** 5, '1MB': 10 ** 6, '10MB': 10 ** 7, '100MB': 10 ** 8}
+
+# A result regresses if it is worse than its baseline by more than this fraction
+DEFAULT_THRESHOLD = 0.10
+
+
+def _time_call(function, minimum_seconds: float) -> float:
+    """
+    Calls <function> repeatedly for at least <minimum_seconds> and returns the average seconds per call.
+    """
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while calls == 0 or elapsed < minimum_seconds:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return elapsed / calls
+
+
+def bench_boundary_latency(minimum_seconds: float) -> list[dict]:
+    """
+    Returns the per-call latency of hash_main.hash for every padding-boundary size.
+    """
+    results = []
+    for bits in BOUNDARY_BITS:
+        message = 'a' * (bits // 8)
+        seconds = _time_call(lambda: hash_main.hash(message), minimum_seconds)
+        results.append(_result(f'hash_latency_{bits}_bits', seconds * 1e6, 'us', higher_is_better=False))
+    return results
+
+
+def bench_throughput(max_size: int, minimum_seconds: float) -> list[dict]:
+    """
+    Returns the MB/s throughput of MD5Hasher for every throughput size up to <max_size> bytes.
+    """
+    results = []
+    for label, size in THROUGHPUT_SIZES.items():
+        if size > max_size:
+            continue
+        data = bytes(size)
+        seconds = _time_call(lambda: MD5Hasher(data).digest(), minimum_seconds)
+        results.append(_result(f'throughput_{label}', size / seconds / 1e6, 'MB/s', higher_is_better=True))
+    return results
+
+
+def bench_login_system(accounts: int) -> list[dict]:
+    """
+    Returns the operations per second of LoginSystem.create_new_account and LoginSystem.validate_password over
+    <accounts> accounts.
+    """
+    system = LoginSystem()
+    start = time.perf_counter()
+    for i in range(accounts):
+        system.create_new_account(f'user{i}', f'password{i}')
+    create_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(accounts):
+        system.validate_password(f'user{i}', f'password{i}')
+    validate_seconds = time.perf_counter() - start
+
+    return [_result('login_create', accounts / create_seconds, 'ops/s', higher_is_better=True),
+            _result('login_validate', accounts / validate_seconds, 'ops/s', higher_is_better=True)]
+
+
+def _result(name: str, value: float, unit: str, higher_is_better: bool) -> dict:
+    """
+    Returns one machine-readable benchmark result.
+    """
+    return {'name': name, 'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def compare_to_baseline(results: list[dict], baseline: list[dict], threshold: float = DEFAULT_THRESHOLD) -> \
+        list[str]:
+    """
+    Returns a description of every result that is worse than the result of the same name in <baseline> by more than
+    <threshold> (a fraction of the baseline value). Results missing from the baseline are ignored.
+
+    >>> old = [_result('a', 100.0, 'ops/s', True), _result('b', 10.0, 'us', False)]
+    >>> new = [_result('a', 85.0, 'ops/s', True), _result('b', 10.5, 'us', False)]
+    >>> compare_to_baseline(new, old)
+    ['a: 85.00 ops/s vs baseline 100.00 ops/s (-15.0%)']
+    """
+    baseline_values = {result['name']: result['value'] for result in baseline}
+    regressions = []
+    for result in results:
+        old = baseline_values.get(result['name'])
+        if not old:
+            continue
+        change = (result['value'] - old) / old
+        if (change < -threshold) if result['higher_is_better'] else (change > threshold):
+            regressions.append(f"{result['name']}: {result['value']:.2f} {result['unit']} vs baseline {old:.2f} "
+                               f"{result['unit']} ({change:+.1%})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Command-line entry point: runs every benchmark, prints the results and optionally writes them as JSON and
+    compares them against a stored baseline.
+
+    Returns the exit status (1 if any result regressed past the threshold, 0 otherwise).
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark the MD5 implementation.')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare the results against this JSON file of stored results')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed regression fraction')
+    parser.add_argument('--max-size', type=int, default=10 ** 8, help='largest throughput input, in bytes')
+    parser.add_argument('--min-time', type=float, default=0.5, help='minimum seconds to time each case for')
+    parser.add_argument('--accounts', type=int, default=2000, help='accounts for the LoginSystem benchmarks')
+    args = parser.parse_args(argv)
+
+    results = (bench_boundary_latency(args.min_time) + bench_throughput(args.max_size, args.min_time)
+               + bench_login_system(args.accounts))
+    for result in results:
+        print(f"{result['name']:<28} {result['value']:>14.2f} {result['unit']}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare_to_baseline(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print('REGRESSION ' + regression, file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import struct
+
 import utils
 
 class Block:
@@ -6,12 +8,18 @@ class Block:
 
     ABSTRACT CLASS INHERITED BY CompletedBlock, MidBlock, and PaddedBlock.
 
+    A Block is either in BIT MODE (built from a bit string, stored as 64 strings of 8 bits in packaged_bits) or in
+    COMPACT MODE (built from a bytes-like object, stored as 64 raw bytes in packaged_bytes). The M-values are
+    available from both modes through get_m_values.
+
     === REPRESENTATION INVARIANTS ===
-    len(packaged_bits) == 64
+    Exactly one of packaged_bits and packaged_bytes is None.
+    packaged_bits is None or len(packaged_bits) == 64
+    packaged_bytes is None or len(packaged_bytes) == 64
     """
 
-    packaged_bits: list[str]
-    hexa_lst: list[str]
+    packaged_bits: list[str] | None
+    packaged_bytes: bytes | memoryview | None
 
     def __init__(self, bit_string: str) -> None:
         """
@@ -21,20 +29,35 @@ class Block:
         """
         raise NotImplementedError
 
-    def update_hexa_lst(self, hexa_str: str) -> None:
+    def is_compact(self) -> bool:
         """
-        Appends the hexa_str inputted to the hexa_lst instance attribute.
+        Returns true if this Block is backed by raw bytes (compact mode), and false if it is backed by bit strings.
         """
-        self.hexa_lst.append(hexa_str)
+        return self.packaged_bytes is not None
 
+    def get_m_values(self) -> tuple[int, ...]:
+        """
+        Returns the sixteen 32-bit M-values of this Block. Each M-value is made up of four consecutive bytes of the
+        block, read in little-endian order as per MD5 format.
+
+        In compact mode the M-values are unpacked straight from the underlying buffer.
+        """
+        if self.packaged_bytes is not None:
+            return struct.unpack('<16I', self.packaged_bytes)
+        return struct.unpack('<16I', bytes(int(bits, 2) for bits in self.packaged_bits))
 
     def __str__(self) -> str:
         """
         Returns an 8 x 8 box representation of a Block, containing bit strings of size 8 bits.
         """
+        if self.packaged_bytes is not None:
+            packaged_bits = [utils.byte_to_bits(byte) for byte in self.packaged_bytes]
+        else:
+            packaged_bits = self.packaged_bits
+
         counter = 0
         ret_str = ''
-        for bit_string in self.packaged_bits:
+        for bit_string in packaged_bits:
             if counter == 8:
                 ret_str += '\n'
                 counter = 0
@@ -50,21 +73,25 @@ class CompleteBlock(Block):
     Represents ONE 512-bit Block with NO PADDING (pure input data).
 
     === REPRESENTATION INVARIANTS ===
-    Exactly 512 bits must be passed in through the string representation bit_string (bit_length == 512).
+    Exactly 512 bits must be passed in through the string representation bit_string (bit_length == 512), or at least
+    64 bytes through a bytes-like bit_string (compact mode; only the first 64 bytes are used).
     """
 
-    packaged_bits: list[str]
-    # HEXA NOT UPDATED UNTIL AFTER INITIALIZATION PROCESS IS COMPLETE
-    hexa_lst: list[str]
+    packaged_bits: list[str] | None
+    packaged_bytes: bytes | memoryview | None
 
-    def __init__(self, bit_string: str) -> None:
+    def __init__(self, bit_string: str | bytes | memoryview) -> None:
         """
         Creates a CompleteBlock instance.
         """
-        bit_lst = bit_string.split(' ')
-        self.packaged_bits = bit_lst[-64:]
-
-        self.hexa_lst = []
+        if isinstance(bit_string, str):
+            bit_lst = bit_string.split(' ')
+            self.packaged_bits = bit_lst[:64]
+            self.packaged_bytes = None
+        else:
+            # Keep a view of the caller's buffer instead of copying the block
+            self.packaged_bits = None
+            self.packaged_bytes = memoryview(bit_string)[:64]
 
 
 class MidBlock(Block):
@@ -73,24 +100,28 @@ class MidBlock(Block):
 
     === REPRESENTATION INVARIANTS ===
     Between 448 and 511 (inclusive) bits must be passed in through the string representation bit_string
-    (448 <= bit_length <= 511).
+    (448 <= bit_length <= 511), or between 56 and 63 (inclusive) bytes through a bytes-like bit_string (compact mode).
     """
 
-    packaged_bits: list[str]
+    packaged_bits: list[str] | None
+    packaged_bytes: bytes | memoryview | None
     number_of_zeros_to_512: int
-    hexa_lst: list[str]
 
-    def __init__(self, bit_string: str, bit_length: int) -> None:
+    def __init__(self, bit_string: str | bytes | memoryview, bit_length: int) -> None:
         """
         Creates a MidBlock instance.
         """
-        bit_lst = bit_string.split(' ')
-        self.packaged_bits = bit_lst[:]
         self.number_of_zeros_to_512 = 512 - 1 - bit_length
-        self.packaged_bits.append('10000000')
-        self.packaged_bits.extend(['00000000' for i in range((self.number_of_zeros_to_512 - 7) // 8)])
 
-        self.hexa_lst = []
+        if isinstance(bit_string, str):
+            bit_lst = bit_string.split(' ')
+            self.packaged_bits = bit_lst[:]
+            self.packaged_bits.append('10000000')
+            self.packaged_bits.extend(['00000000' for i in range((self.number_of_zeros_to_512 - 7) // 8)])
+            self.packaged_bytes = None
+        else:
+            self.packaged_bits = None
+            self.packaged_bytes = bytes(bit_string) + b'\x80' + b'\x00' * ((self.number_of_zeros_to_512 - 7) // 8)
 
 
 class PaddedBlock(Block):
@@ -98,48 +129,109 @@ class PaddedBlock(Block):
     Represents ONE 512-bit Block that contains at least one bit of padding.
 
     === REPRESENTATION INVARIANTS ===
-    Up to 447 bits must be passed in through the string representation bit_string (bit_length <= 447).
+    Up to 447 bits must be passed in through the string representation bit_string (bit_length <= 447), or up to 55
+    bytes through a bytes-like bit_string (compact mode).
+    If padding_started is True, the single 1 bit of padding was already written by a preceding MidBlock
+    (bit_length == 0).
     """
 
-    packaged_bits: list[str]
+    packaged_bits: list[str] | None
+    packaged_bytes: bytes | memoryview | None
     number_of_zeros_to_448: int
     bit_length: int
-    hexa_lst: list[str]
+    padding_started: bool
 
-    def __init__(self, bit_string: str, bit_length: int, fixed_bit_length: int) -> None:
+    def __init__(self, bit_string: str | bytes | memoryview, bit_length: int, fixed_bit_length: int,
+                 padding_started: bool = False) -> None:
         """
         Creates a PaddedBlock instance.
         """
-        self.packaged_bits = []
+        self.packaged_bits = None
+        self.packaged_bytes = None
         self.bit_length = bit_length
+        self.padding_started = padding_started
         self.number_of_zeros_to_448 = 448 - 1 - bit_length
-        self._populate_packaged_bits(bit_string, fixed_bit_length)
 
-        self.hexa_lst = []
+        if isinstance(bit_string, str):
+            self._populate_packaged_bits(bit_string, fixed_bit_length)
+        else:
+            self._populate_packaged_bytes(bit_string, fixed_bit_length)
 
     def _populate_packaged_bits(self, bit_string: str, fixed_bit_length: int) -> None:
         """
         Populate packaged bits depending on length of bit_string.
         """
+        self.packaged_bits = []
         if bit_string != '':
             bit_lst = bit_string.split(' ')
             self.packaged_bits = bit_lst[:]
 
-        if self.bit_length == 0:
+        if self.padding_started:
             self.packaged_bits.append('00000000')
         else:
             self.packaged_bits.append('10000000')
 
         self.packaged_bits.extend(['00000000' for i in range((self.number_of_zeros_to_448 - 7) // 8)])
 
-        length_as_bytes = utils.int_to_bytes(fixed_bit_length)
-        length_as_bits_lst = [utils.byte_to_bits(byte) for byte in length_as_bytes]
+        # The original length is stored as a 64-bit little-endian integer (modulo 2^64) as per MD5 format
+        length_as_bytes = (fixed_bit_length & 0xFFFFFFFFFFFFFFFF).to_bytes(8, 'little')
+        self.packaged_bits.extend([utils.byte_to_bits(byte) for byte in length_as_bytes])
 
-        if len(length_as_bits_lst) * 8 >= 64:
-            for i in range(-8, 0, 1):
-                self.packaged_bits.append(length_as_bits_lst[i])
-        else:
-            self.packaged_bits.extend(['00000000' for i in range(8 - len(length_as_bits_lst))])
-            self.packaged_bits.extend(length_as_bits_lst)
+    def _populate_packaged_bytes(self, data: bytes | memoryview, fixed_bit_length: int) -> None:
+        """
+        Populate packaged bytes (compact mode) depending on length of data.
+        """
+        first_padding_byte = b'\x00' if self.padding_started else b'\x80'
+        self.packaged_bytes = (bytes(data) + first_padding_byte + b'\x00' * ((self.number_of_zeros_to_448 - 7) // 8)
+                               + (fixed_bit_length & 0xFFFFFFFFFFFFFFFF).to_bytes(8, 'little'))
+
+
+class CandidateBlock:
+    """
+    Represents the ONE padded 512-bit block of a message of a fixed length (at most 55 bytes), whose message bytes
+    are patched in place.
+
+    Built for enumerating many candidates of the same length: the padding and length M-values are computed once, and
+    changing a byte of the candidate only updates the one M-value that contains it, with no re-encoding and no new
+    Block objects.
+
+    >>> block = CandidateBlock(3)
+    >>> block.set_bytes(b'abc')
+    >>> tuple(block.m_values) == PaddedBlock(b'abc', 24, 24).get_m_values()
+    True
+
+    === REPRESENTATION INVARIANTS ===
+    0 <= length <= 55
+    len(m_values) == 16
+    """
 
+    length: int
+    m_values: list[int]
 
+    def __init__(self, length: int) -> None:
+        """
+        Creates a CandidateBlock instance for messages of <length> bytes, initially all zero bytes.
+        """
+        if not 0 <= length <= 55:
+            raise ValueError('A CandidateBlock holds messages of at most 55 bytes')
+        self.length = length
+        self.m_values = list(PaddedBlock(bytes(length), length * 8, length * 8).get_m_values())
+
+    def set_byte(self, position: int, value: int) -> None:
+        """
+        Sets byte number <position> of the message to <value> (0 to 255), updating only the M-value that contains it.
+        """
+        if not 0 <= value <= 0xFF:
+            raise ValueError(f'A byte must be between 0 and 255, got {value}')
+        shift = (position & 3) << 3
+        word = position >> 2
+        self.m_values[word] = (self.m_values[word] & ~(0xFF << shift)) | (value << shift)
+
+    def set_bytes(self, message: bytes) -> None:
+        """
+        Replaces the whole message with <message>, which must be exactly length bytes long.
+        """
+        if len(message) != self.length:
+            raise ValueError(f'Expected a message of {self.length} bytes, got {len(message)}')
+        for position, value in enumerate(message):
+            self.set_byte(position, value)
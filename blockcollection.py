@@ -1,3 +1,5 @@
+from typing import Iterator
+
 from block import Block, CompleteBlock, MidBlock, PaddedBlock
 
 
@@ -5,38 +7,69 @@ class BlockCollection:
     """
     An organized collection of at least one 512-bit Block objects used to model a padded input as per MD5 format.
 
+    The input is either a space-separated bit string (bit mode) or a bytes-like object (compact mode), in which case
+    every Block is backed by raw bytes and bit_length may be omitted.
+
+    A lazy BlockCollection does not store its blocks: iterating over it generates them one at a time, in order,
+    without copying the remaining input, so inputs of any size can be traversed in constant memory. Otherwise all the
+    blocks are generated up front and stored in collection.
+
     === REPRESENTATION INVARIANTS ===
-    len(self.collection) >= 1
+    collection is None or len(self.collection) >= 1
     """
 
-    collection: list[Block]
+    collection: list[Block] | None
+    _bit_string: str | memoryview
+    _bit_length: int
 
-    def __init__(self, bit_string: str, bit_length: int) -> None:
+    def __init__(self, bit_string: str | bytes | memoryview, bit_length: int | None = None,
+                 lazy: bool = False) -> None:
         """
         Creates a BlockCollection instance.
         """
-        self.collection = []
+        if not isinstance(bit_string, str):
+            bit_string = memoryview(bit_string).cast('B')
+            if bit_length is None:
+                bit_length = len(bit_string) * 8
 
-        self._populate_collection(bit_string, bit_length, bit_length)
+        self._bit_string = bit_string
+        self._bit_length = bit_length
 
-    def _populate_collection(self, bit_string: str, bit_length: int, fixed_bit_length: int) -> None:
+        if lazy:
+            self.collection = None
+        else:
+            self.collection = list(self._generate_blocks())
+
+    def __iter__(self) -> Iterator[Block]:
         """
-        A "factory-esque" method that creates the appropriate Block type instantiations
-        to add to a collection of 512-bit blocks that comprise an inputted password.
+        Returns an iterator over the blocks of this collection, in order.
         """
-        # Base case 1
+        if self.collection is not None:
+            return iter(self.collection)
+        return self._generate_blocks()
+
+    def _generate_blocks(self) -> Iterator[Block]:
+        """
+        A "factory-esque" generator that creates the appropriate Block type instantiations
+        for the collection of 512-bit blocks that comprise an inputted password.
+        """
+        bit_string = self._bit_string
+        fixed_bit_length = self._bit_length
+
+        # Each CompleteBlock takes up 64 bytes in compact mode, or 64 8-bit strings plus their separating spaces in
+        # bit mode. Only the current block is sliced out of the input, never the remaining input.
+        step = 576 if isinstance(bit_string, str) else 64
+        start = 0
+        bit_length = fixed_bit_length
+        while bit_length >= 512:
+            yield CompleteBlock(bit_string[start:start + step])
+            start += step
+            bit_length -= 512
+
+        remaining_bits = bit_string[start:]
         if bit_length < 448:
-            self.collection.append(PaddedBlock(bit_string, bit_length, fixed_bit_length))
-        # Base case 2
-        elif bit_length == 448:
-            self.collection.append(MidBlock(bit_string, bit_length))
-            self.collection.append(PaddedBlock('', 0, fixed_bit_length))
-        # Base case 3
-        elif bit_length >= 449 and bit_length <= 511:
-            self.collection.append(MidBlock(bit_string, bit_length))
-            self.collection.append(PaddedBlock('', 0, fixed_bit_length))
+            yield PaddedBlock(remaining_bits, bit_length, fixed_bit_length)
         else:
-            self.collection.append(CompleteBlock(bit_string))
-            # Apply recursive step on the next bits after the rightmost 512 bits have been used on a CompleteBlock
-            self._populate_collection(bit_string[:-576], bit_length - 512, fixed_bit_length)
-
+            # 448 <= bit_length <= 511: the padding continues into one more block that holds the length
+            yield MidBlock(remaining_bits, bit_length)
+            yield PaddedBlock(remaining_bits[:0], 0, fixed_bit_length, padding_started=True)
@@ -0,0 +1,228 @@
+import mmap
+import os
+from typing import Iterable, Iterator
+
+# Every index file starts with this header, followed by the records sorted by username
+FILE_HEADER = b'MD5IDX01'
+
+# Each record is a NUL-padded username followed by its raw 16-byte digest
+USERNAME_WIDTH = 32
+DIGEST_WIDTH = 16
+RECORD_WIDTH = USERNAME_WIDTH + DIGEST_WIDTH
+
+# Number of buffered writes that triggers a merge into the index file
+DEFAULT_MERGE_THRESHOLD = 4096
+
+
+class DigestIndex:
+    """
+    A persistent username -> hash store for LoginSystem, kept in a sorted binary file of fixed-width records.
+
+    The file is memory-mapped and binary-searched on lookup, so opening an index does not load any account into
+    Python objects. New accounts go into a small in-memory write buffer that is merged into the file (one sequential
+    pass, replacing the file atomically) once it holds merge_threshold accounts, and when the index is closed.
+
+    Behaves like a dict of usernames to 32-character hexadecimal hashes for LoginSystem, but accounts cannot be
+    removed.
+
+    === REPRESENTATION INVARIANTS ===
+    The records in the file are sorted by username and usernames are unique.
+    len(username.encode('utf-8')) <= USERNAME_WIDTH for every username.
+    """
+
+    path: str
+    merge_threshold: int
+    write_buffer: dict[bytes, bytes]
+    _mapped: mmap.mmap | None
+    _record_count: int
+    _new_key_count: int
+
+    def __init__(self, path: str | os.PathLike, merge_threshold: int = DEFAULT_MERGE_THRESHOLD) -> None:
+        """
+        Opens the index file at <path>, creating an empty one if it does not exist yet.
+        """
+        self.path = os.fspath(path)
+        self.merge_threshold = merge_threshold
+        self.write_buffer = {}
+        self._mapped = None
+        self._new_key_count = 0
+
+        if not os.path.exists(self.path):
+            with open(self.path, 'wb') as file:
+                file.write(FILE_HEADER)
+        self._open_file()
+
+    def _open_file(self) -> None:
+        """
+        Memory-maps the index file and checks its header.
+        """
+        with open(self.path, 'rb') as file:
+            self._mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mapped[:len(FILE_HEADER)] != FILE_HEADER:
+            self._mapped.close()
+            self._mapped = None
+            raise ValueError(f'{self.path} is not a digest index file')
+        self._record_count = (len(self._mapped) - len(FILE_HEADER)) // RECORD_WIDTH
+
+    def _find_in_file(self, key: bytes) -> bytes | None:
+        """
+        Binary-searches the index file for the padded username <key> and returns its digest, or None if it is not
+        in the file.
+        """
+        mapped = self._mapped
+        low, high = 0, self._record_count
+        while low < high:
+            middle = (low + high) // 2
+            offset = len(FILE_HEADER) + middle * RECORD_WIDTH
+            record_key = mapped[offset:offset + USERNAME_WIDTH]
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                return mapped[offset + USERNAME_WIDTH:offset + RECORD_WIDTH]
+        return None
+
+    def _iter_file(self) -> Iterator[tuple[bytes, bytes]]:
+        """
+        Yields (padded username, digest) pairs for every record in the index file, in sorted order.
+        """
+        mapped = self._mapped
+        for i in range(self._record_count):
+            offset = len(FILE_HEADER) + i * RECORD_WIDTH
+            yield mapped[offset:offset + USERNAME_WIDTH], mapped[offset + USERNAME_WIDTH:offset + RECORD_WIDTH]
+
+    def get_digest(self, username: str) -> bytes | None:
+        """
+        Returns the raw 16-byte digest stored for <username>, or None if there is no such account.
+        """
+        key = _encode_username(username)
+        digest = self.write_buffer.get(key)
+        if digest is None:
+            digest = self._find_in_file(key)
+        return digest
+
+    def __contains__(self, username: str) -> bool:
+        """
+        Returns true if an account with <username> is stored in the index.
+        """
+        return self.get_digest(username) is not None
+
+    def __getitem__(self, username: str) -> str:
+        """
+        Returns the hash stored for <username> as a 32-character hexadecimal string.
+        """
+        digest = self.get_digest(username)
+        if digest is None:
+            raise KeyError(username)
+        return digest.hex()
+
+    def __setitem__(self, username: str, hashed_password: str) -> None:
+        """
+        Stores the 32-character hexadecimal <hashed_password> for <username>, replacing any previous hash.
+        """
+        self._buffer_account(username, hashed_password)
+        if len(self.write_buffer) >= self.merge_threshold:
+            self.merge()
+
+    def update(self, accounts: Iterable[tuple[str, str]]) -> None:
+        """
+        Stores every (username, hashed password) pair in <accounts>, then merges them into the index file in a single
+        pass.
+        """
+        for username, hashed_password in accounts:
+            self._buffer_account(username, hashed_password)
+        self.merge()
+
+    def _buffer_account(self, username: str, hashed_password: str) -> None:
+        """
+        Adds an account to the write buffer, counting it if the username is new to the index.
+        """
+        key = _encode_username(username)
+        if key not in self.write_buffer and self._find_in_file(key) is None:
+            self._new_key_count += 1
+        self.write_buffer[key] = bytes.fromhex(hashed_password)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of accounts stored in the index.
+        """
+        return self._record_count + self._new_key_count
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Yields every username in the index in sorted order.
+        """
+        for key, _ in self._iter_merged():
+            yield key.rstrip(b'\x00').decode('utf-8')
+
+    def _iter_merged(self) -> Iterator[tuple[bytes, bytes]]:
+        """
+        Yields (padded username, digest) pairs from the index file and the write buffer in sorted order. Buffered
+        digests replace the ones in the file.
+        """
+        buffered = sorted(self.write_buffer.items())
+        i = 0
+        for key, digest in self._iter_file():
+            while i < len(buffered) and buffered[i][0] < key:
+                yield buffered[i]
+                i += 1
+            if i < len(buffered) and buffered[i][0] == key:
+                yield buffered[i]
+                i += 1
+            else:
+                yield key, digest
+        yield from buffered[i:]
+
+    def merge(self) -> None:
+        """
+        Merges the write buffer into the index file in one sequential pass and empties the buffer.
+
+        The merged records are written to a temporary file which then atomically replaces the index file, so the
+        index file is never left half-written.
+        """
+        if not self.write_buffer:
+            return
+
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            file.write(FILE_HEADER)
+            for key, digest in self._iter_merged():
+                file.write(key)
+                file.write(digest)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self._mapped.close()
+        os.replace(temporary_path, self.path)
+        self.write_buffer = {}
+        self._new_key_count = 0
+        self._open_file()
+
+    def close(self) -> None:
+        """
+        Merges any buffered accounts into the index file and closes it.
+        """
+        if self._mapped is not None:
+            self.merge()
+            self._mapped.close()
+            self._mapped = None
+
+    def __enter__(self) -> 'DigestIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _encode_username(username: str) -> bytes:
+    """
+    Returns <username> as a NUL-padded key of exactly USERNAME_WIDTH bytes.
+
+    >>> _encode_username('guest')[:6]
+    b'guest\\x00'
+    """
+    encoded = username.encode('utf-8')
+    if len(encoded) > USERNAME_WIDTH or b'\x00' in encoded:
+        raise ValueError(f'Usernames must be at most {USERNAME_WIDTH} bytes long and must not contain NUL characters')
+    return encoded.ljust(USERNAME_WIDTH, b'\x00')
@@ -0,0 +1,185 @@
+import zlib
+from array import array
+from typing import Iterable, Iterator
+
+# Size of a raw MD5 digest
+DIGEST_WIDTH = 16
+
+# Number of entries in the hash table of an empty CompactDigestStore (a power of two)
+_INITIAL_TABLE_SIZE = 8
+
+
+class DigestRecord:
+    """
+    One (username, raw digest) account record, for code that needs account objects from a CompactDigestStore.
+    """
+
+    __slots__ = ('username', 'digest')
+
+    username: str
+    digest: bytes
+
+    def __init__(self, username: str, digest: bytes) -> None:
+        """
+        Creates a DigestRecord instance.
+        """
+        self.username = username
+        self.digest = digest
+
+    def __repr__(self) -> str:
+        return f'DigestRecord({self.username!r}, {self.digest.hex()!r})'
+
+
+class CompactDigestStore:
+    """
+    An in-memory username -> hash store for LoginSystem that keeps every account in a few flat buffers instead of a
+    dict of str objects, so an account costs a few dozen bytes instead of well over a hundred.
+
+    Account i (its slot) has the UTF-8 username names[name_ends[i - 1]:name_ends[i]] (from 0 for slot 0) and the raw
+    digest digests[16 * i:16 * (i + 1)]. Usernames are found through table, an open-addressed hash table of slot
+    numbers (-1 for an empty entry) probed linearly from the CRC-32 of the username, which is never more than
+    two-thirds full. Usernames may take up to 4 GiB in total. Behaves like a dict of usernames to 32-character
+    hexadecimal hashes for LoginSystem, but accounts cannot be removed.
+
+    >>> store = CompactDigestStore()
+    >>> store['guest'] = '0cc175b9c0f1b6a831c399e269772661'
+    >>> store['guest'], len(store.digests), bytes(store.names)
+    ('0cc175b9c0f1b6a831c399e269772661', 16, b'guest')
+
+    === REPRESENTATION INVARIANTS ===
+    len(digests) == DIGEST_WIDTH * len(name_ends)
+    len(table) is a power of two and 3 * len(name_ends) < 2 * len(table)
+    every slot number appears in table exactly once
+    """
+
+    names: bytearray
+    name_ends: array
+    digests: bytearray
+    table: array
+
+    def __init__(self) -> None:
+        """
+        Creates an empty CompactDigestStore instance.
+        """
+        self.names = bytearray()
+        self.name_ends = array('I')
+        self.digests = bytearray()
+        self.table = array('i', [-1]) * _INITIAL_TABLE_SIZE
+
+    def _name(self, slot: int) -> bytes:
+        """
+        Returns the UTF-8 username stored in <slot>.
+        """
+        return self.names[self.name_ends[slot - 1] if slot else 0:self.name_ends[slot]]
+
+    def _find(self, encoded: bytes) -> tuple[int, int]:
+        """
+        Returns (table position, slot) for the UTF-8 username <encoded>, or (position of the empty entry where it
+        belongs, -1) if there is no such account.
+        """
+        table = self.table
+        mask = len(table) - 1
+        position = zlib.crc32(encoded) & mask
+        while (slot := table[position]) != -1:
+            if self._name(slot) == encoded:
+                return position, slot
+            position = (position + 1) & mask
+        return position, -1
+
+    def _grow(self) -> None:
+        """
+        Doubles the size of the hash table and re-inserts every slot.
+        """
+        table = array('i', [-1]) * (2 * len(self.table))
+        mask = len(table) - 1
+        for slot in range(len(self.name_ends)):
+            position = zlib.crc32(self._name(slot)) & mask
+            while table[position] != -1:
+                position = (position + 1) & mask
+            table[position] = slot
+        self.table = table
+
+    def _slot(self, username: str) -> int:
+        """
+        Returns the slot of <username>, or -1 if there is no such account.
+        """
+        return self._find(username.encode('utf-8'))[1]
+
+    def get_digest(self, username: str) -> bytes | None:
+        """
+        Returns the raw 16-byte digest stored for <username>, or None if there is no such account.
+        """
+        slot = self._slot(username)
+        if slot == -1:
+            return None
+        offset = slot * DIGEST_WIDTH
+        return bytes(self.digests[offset:offset + DIGEST_WIDTH])
+
+    def set_digest(self, username: str, digest: bytes) -> None:
+        """
+        Stores the raw 16-byte <digest> for <username>, overwriting its slot if the account already exists.
+        """
+        if len(digest) != DIGEST_WIDTH:
+            raise ValueError(f'Digests must be {DIGEST_WIDTH} bytes long')
+        encoded = username.encode('utf-8')
+        position, slot = self._find(encoded)
+        if slot != -1:
+            self.digests[slot * DIGEST_WIDTH:(slot + 1) * DIGEST_WIDTH] = digest
+            return
+
+        self.table[position] = len(self.name_ends)
+        self.names += encoded
+        self.name_ends.append(len(self.names))
+        self.digests += digest
+        if 3 * len(self.name_ends) >= 2 * len(self.table):
+            self._grow()
+
+    def __contains__(self, username: str) -> bool:
+        """
+        Returns true if an account with <username> is stored.
+        """
+        return self._slot(username) != -1
+
+    def __getitem__(self, username: str) -> str:
+        """
+        Returns the hash stored for <username> as a 32-character hexadecimal string.
+        """
+        digest = self.get_digest(username)
+        if digest is None:
+            raise KeyError(username)
+        return digest.hex()
+
+    def __setitem__(self, username: str, hashed_password: str) -> None:
+        """
+        Stores the 32-character hexadecimal <hashed_password> for <username>.
+        """
+        self.set_digest(username, bytes.fromhex(hashed_password))
+
+    def update(self, accounts: Iterable[tuple[str, str]]) -> None:
+        """
+        Stores every (username, hashed password) pair in <accounts>.
+        """
+        for username, hashed_password in accounts:
+            self[username] = hashed_password
+
+    def __len__(self) -> int:
+        """
+        Returns the number of accounts stored.
+        """
+        return len(self.name_ends)
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Yields every username in insertion order.
+        """
+        for slot in range(len(self.name_ends)):
+            yield self._name(slot).decode('utf-8')
+
+    def records(self) -> Iterator[DigestRecord]:
+        """
+        Yields a DigestRecord for every account in insertion order.
+        """
+        digests = self.digests
+        for slot in range(len(self.name_ends)):
+            offset = slot * DIGEST_WIDTH
+            yield DigestRecord(self._name(slot).decode('utf-8'), bytes(digests[offset:offset + DIGEST_WIDTH]))
@@ -0,0 +1,119 @@
+import argparse
+import mmap
+import os
+import sys
+import time
+
+from hasher import MD5Hasher
+
+# Size of each read when a file is hashed in chunks (a multiple of 64 bytes so that no partial block is buffered)
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str | os.PathLike, use_mmap: bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """
+    Returns the MD5 hash (32-character hexadecimal string) of the contents of the file at <path>.
+
+    The file is never loaded into a str: with use_mmap the compression loop reads the blocks straight out of a
+    memory-mapped view of the file, otherwise the file is read into one reusable buffer of chunk_size bytes at a time.
+    Either way, memory use does not grow with the size of the file.
+    """
+    return hash_file_timed(path, use_mmap, chunk_size)[0]
+
+
+def hash_file_timed(path: str | os.PathLike, use_mmap: bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE) -> \
+        tuple[str, int, float]:
+    """
+    Hashes the file at <path> the same way as hash_file and returns a tuple in the form
+    (hash, number of bytes hashed, elapsed seconds) so that the throughput can be reported.
+    """
+    if chunk_size <= 0:
+        raise ValueError('The chunk size must be a positive number of bytes')
+    hasher = MD5Hasher()
+    start = time.perf_counter()
+
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        # Empty files cannot be memory-mapped
+        if use_mmap and size > 0:
+            _update_from_mmap(hasher, file)
+        else:
+            _update_from_chunks(hasher, file, chunk_size)
+
+    elapsed = time.perf_counter() - start
+    return hasher.hexdigest(), hasher.message_length, elapsed
+
+
+def _update_from_mmap(hasher: MD5Hasher, file) -> None:
+    """
+    Feeds the whole of <file> to <hasher> through a read-only memory map.
+    """
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        # The view has to be released before the map can be closed
+        with memoryview(mapped) as view:
+            hasher.update(view)
+
+
+def _update_from_chunks(hasher: MD5Hasher, file, chunk_size: int) -> None:
+    """
+    Feeds <file> to <hasher> in fixed-size reads into a single reusable buffer.
+    """
+    buffer = bytearray(chunk_size)
+    with memoryview(buffer) as view:
+        bytes_read = file.readinto(buffer)
+        while bytes_read:
+            hasher.update(view[:bytes_read])
+            bytes_read = file.readinto(buffer)
+
+
+def _positive_int(value: str) -> int:
+    """
+    Returns <value> as an int for argparse, rejecting anything that is not a positive integer.
+    """
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f'{value} is not a positive integer')
+    return number
+
+
+def _format_throughput(size: int, elapsed: float) -> str:
+    """
+    Returns a human-readable throughput report for <size> bytes hashed in <elapsed> seconds.
+
+    >>> _format_throughput(3 * 1024 * 1024, 2.0)
+    '3.0 MiB in 2.000 s (1.50 MiB/s)'
+    """
+    mib = size / (1024 * 1024)
+    rate = mib / elapsed if elapsed > 0 else float('inf')
+    return f'{mib:.1f} MiB in {elapsed:.3f} s ({rate:.2f} MiB/s)'
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Command-line entry point: prints "<hash>  <path>" for every file, like md5sum.
+
+    Returns the exit status (1 if any file could not be read, 0 otherwise).
+    """
+    parser = argparse.ArgumentParser(prog='python -m file_hashing', description='Hash files with MD5.')
+    parser.add_argument('paths', nargs='+', help='files to hash')
+    parser.add_argument('--no-mmap', action='store_true', help='use chunked reads instead of memory mapping')
+    parser.add_argument('--chunk-size', type=_positive_int, default=DEFAULT_CHUNK_SIZE, help='bytes per chunked read')
+    parser.add_argument('--stats', action='store_true', help='report the throughput for each file on stderr')
+    args = parser.parse_args(argv)
+
+    status = 0
+    for path in args.paths:
+        try:
+            digest, size, elapsed = hash_file_timed(path, not args.no_mmap, args.chunk_size)
+        except OSError as error:
+            print(f'{path}: {error.strerror}', file=sys.stderr)
+            status = 1
+            continue
+        print(f'{digest}  {path}')
+        if args.stats:
+            print(f'{path}: {_format_throughput(size, elapsed)}', file=sys.stderr)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
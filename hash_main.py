@@ -1,3 +1,6 @@
+import time
+
+import instrumentation
 import utils
 from blockcollection import BlockCollection
 """
@@ -5,6 +8,35 @@ PROJECT GUIDE REFERENCE:
 https://www.comparitech.com/blog/information-security/md5-algorithm-with-examples/
 """
 
+# All A, B, C, D vectors, K-constants and M-values are kept as native 32-bit integers; every modular addition is
+# reduced with this mask instead of round-tripping through hexadecimal strings.
+WORD_MASK = 0xFFFFFFFF
+
+# Initialization vectors (A, B, C, D) as 32-bit words
+INITIAL_VECTORS = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476)
+
+# Define the set of all k-values
+K_VALUES = (0xD76AA478, 0xE8C7B756, 0x242070DB, 0xC1BDCEEE, 0xF57C0FAF, 0x4787C62A, 0xA8304613, 0xFD469501,
+            0x698098D8, 0x8B44F7AF, 0xFFFF5BB1, 0x895CD7BE, 0x6B901122, 0xFD987193, 0xA679438E, 0x49B40821,
+            0xF61E2562, 0xC040B340, 0x265E5A51, 0xE9B6C7AA, 0xD62F105D, 0x02441453, 0xD8A1E681, 0xE7D3FBC8,
+            0x21E1CDE6, 0xC33707D6, 0xF4D50D87, 0x455A14ED, 0xA9E3E905, 0xFCEFA3F8, 0x676F02D9, 0x8D2A4C8A,
+            0xFFFA3942, 0x8771F681, 0x6D9D6122, 0xFDE5380C, 0xA4BEEA44, 0x4BDECFA9, 0xF6BB4B60, 0xBEBFBC70,
+            0x289B7EC6, 0xEAA127FA, 0xD4EF3085, 0x04881D05, 0xD9D4D039, 0xE6DB99E5, 0x1FA27CF8, 0xC4AC5665,
+            0xF4292244, 0x432AFF97, 0xAB9423A7, 0xFC93A039, 0x655B59C3, 0x8F0CCC92, 0xFFEFF47D, 0x85845DD1,
+            0x6FA87E4F, 0xFE2CE6E0, 0xA3014314, 0x4E0811A1, 0xF7537E82, 0xBD3AF235, 0x2AD7D2BB, 0xEB86D391)
+
+# Left-rotation amounts for each round, repeated every 4 operations
+ROUND_ONE_SHIFTS = (7, 12, 17, 22)
+ROUND_TWO_SHIFTS = (5, 9, 14, 20)
+ROUND_THREE_SHIFTS = (4, 11, 16, 23)
+ROUND_FOUR_SHIFTS = (6, 10, 15, 21)
+
+# M inputs are loaded in the following order for each round (round one is sequential)
+ROUND_ONE_M_INDICES = tuple(range(16))
+ROUND_TWO_M_INDICES = (1, 6, 11, 0, 5, 10, 15, 4, 9, 14, 3, 8, 13, 2, 7, 12)
+ROUND_THREE_M_INDICES = (5, 8, 11, 14, 1, 4, 7, 10, 13, 0, 3, 6, 9, 12, 15, 2)
+ROUND_FOUR_M_INDICES = (0, 7, 14, 5, 12, 3, 10, 1, 8, 15, 6, 13, 4, 11, 2, 9)
+
 def hash(input_string: str) -> str:
     """
     Takes in input string (attempted password) and provides a MD5 algorithm-based hash result to add to a hash table
@@ -15,530 +47,324 @@ def hash(input_string: str) -> str:
     ARTICLE EXAMPLE
     >>> res = hash('They are deterministic')
     >>> res
+    '23db6982caef9e9152f1a5b2589e6ca3'
     >>> len(res)
+    32
 
     SINGLE ELEMENT EXAMPLE (LOWERCASE)
     >>> res = hash('a')
     >>> res
+    '0cc175b9c0f1b6a831c399e269772661'
     >>> len(res)
+    32
 
     SINGLE ELEMENT EXAMPLE (UPPERCASE)
     >>> res = hash('A')
     >>> res
+    '7fc56270e7a70fa81a5935b72eacbe29'
     >>> len(res)
+    32
 
     OVER 64-bit LENGTH (9,223,372,036,854,775,808 CHARACTERS)
     >>> a = 'a' * 1000
     >>> res = hash(a)
     >>> res
+    'cabe45dcc9ae5b66ba86600cca6b8ba8'
     >>> len(res)
+    32
 
     EXACTLY 1560 (520 * 3) BITS (195 CHARACTERS)
     >>> res = hash('mgmbcihkbcsbswccfkfqpkrxfuxbvnjuwnteqnkedqcbastulcajartugjvahbwwbeqbuixfxbhwevohbyqipnzgvxqhyzqrkdriucnqbcvjcotjbhwxnznodrvkmpdtwxdhbkbdkwuvnfwrbfccfchpachovajyvdoauutsbeibxbnlwhpripoaslqjeobotbo')
     >>> res
+    '4ae7e9204e6cf72442c10d6b5f3dc7a7'
     >>> len(res)
+    32
 
     EXACTLY 512 BITS (64 CHARACTERS)
     >>> res = hash('aitufiyehaidpeyufidopakri1234rpalisojnemryafhxcgrtyabfigjaleodif')
     >>> res
+    'f921e7483d011dc4513261648bd93e82'
     >>> len(res)
+    32
 
     EXACTLY 0 BITS (0 CHARACTERS)
     >>> res = hash('')
     >>> res
+    'd41d8cd98f00b204e9800998ecf8427e'
     >>> len(res)
+    32
 
     EXACTLY 8 BITS (1 CHARACTER)
     >>> res = hash('h')
     >>> res
+    '2510c39011c5be704182423e3a695e91'
     >>> len(res)
+    32
 
     EXACTLY 448 BITS (56 CHARACTERS)
     >>> res = hash('aitufiyehaidpeyufidopakri1234rpalisojnemryafhxcgrtyabfig')
     >>> res
+    '23b28f825c7b2cf35ca7078bc55e35d4'
     >>> len(res)
+    32
 
     EXACTLY 456 BITS (57 CHARACTERS)
     >>> res = hash('aitufiyehaidpeyufidopakri1234rpalisojnemryafhxcgrtyabfigj')
     >>> res
+    'e1e330aeba0af63fe3f67e26e1a0ffef'
     >>> len(res)
+    32
 
     EXACTLY 504 BITS (63 CHARACTERS)
     >>> res = hash('aitufiyehaidpeyufidopakri1234rpalisojnemryafhxcgrtyabfigjaleodi')
     >>> res
+    '6ab40490641a4de9b12c2295f9493a23'
     >>> len(res)
+    32
     """
-    # ORGANIZING ORIGINAL INPUT INTO BITS
-    bit_string = utils.get_bits_as_string(input_string)
-    bit_length = utils.get_number_of_bits_from_bit_string(bit_string)
-    block_collection = BlockCollection(bit_string, bit_length)
-
-    for block in block_collection.collection:
-        curr_set_of_4 = []
-        for i in range(64):
-            curr_set_of_4.append(block.packaged_bits[i])
-            if len(curr_set_of_4) == 4:
-                full_str = "".join(curr_set_of_4)
-                # REFERENCE: https://stackoverflow.com/questions/2072351/python-conversion-from-binary-string-
-                # to-hexadecimal
-                hexa_str = f'{int(full_str, 2):X}'
-                if hexa_str == '0':
-                    block.update_hexa_lst('00000000')
-                elif len(hexa_str) < 8:
-                    zeroes = (8 - len(hexa_str)) * '0'
-                    block.update_hexa_lst(zeroes + hexa_str)
-                else:
-                    block.update_hexa_lst(hexa_str)
-                curr_set_of_4 = []
-
-    # Define the set of all k-values
-    k_values = ['D76AA478',
-                'E8C7B756',
-                '242070DB',
-                'C1BDCEEE',
-                'f57c0faf',
-                '4787C62A',
-                'A8304613',
-                'FD469501',
-                '698098D8',
-                '8B44F7AF',
-                'FFFF5BB1',
-                '895CD7BE',
-                '6B901122',
-                'FD987193',
-                'A679438E',
-                '49B40821',
-                'F61E2562',
-                'C040B340',
-                '265E5A51',
-                'E9B6C7AA',
-                'D62F105D',
-                '02441453',
-                'D8A1E681',
-                'E7D3FBC8',
-                '21E1CDE6',
-                'C33707D6',
-                'F4D50D87',
-                '455A14ED',
-                'A9E3E905',
-                'FCEFA3F8',
-                '676F02D9',
-                '8D2A4C8A',
-                'FFFA3942',
-                '8771F681',
-                '699D6122',
-                'FDE5380C',
-                'A4BEEA44',
-                '4BDECFA9',
-                'F6BB4B60',
-                'BEBFBC70',
-                '289B7EC6',
-                'EAA127FA',
-                'D4EF3085',
-                '04881D05',
-                'D9D4D039',
-                'E6DB99E5',
-                '1FA27CF8',
-                'C4AC5665',
-                'F4292244',
-                '432AFF97',
-                'AB9423A7',
-                'FC93A039',
-                '655B59C3',
-                '8F0CCC92',
-                'FFEFF47D',
-                '85845DD1',
-                '6FA87E4F',
-                'FE2CE6E0',
-                'A3014314',
-                '4E0811A1',
-                'F7537E82',
-                'BD3AF235',
-                '2AD7D2BB',
-                'EB86D391']
-
-    # Initialization vectors
-    a = '01234567'
-    b = '89abcdef'
-    c = 'fedcba98'
-    d = '76543210'
-
-    # Store originals for last modular operations (after 64 rounds)
-    originals = [a, b, c, d]
-
-    # Apply all block operations on each block (see diagram)
-    for block in block_collection.collection:
-        # ROUND 1 DATA LOADING
-
-        # M inputs are sequential, copy block.hexa_lst
-        round_one_m = block.hexa_lst[:]
-
-        round_one_shift_map = {0: 7, 4: 7, 8: 7, 12: 7,
-                               1: 12, 5: 12, 9: 12, 13: 12,
-                               2: 17, 6: 17, 10: 17, 14: 17,
-                               3: 22, 7: 22, 11: 22, 15: 22}
-
-        # Output: 4 new initialization vectors (str) for Round 2 as new A, B, C, D
-        round_one_output = _round_one(a, b, c, d, round_one_m, round_one_shift_map, k_values)
-
-
-        # ROUND 2 DATA LOADING
-
-        # M inputs loaded in the following order
-        round_two_m_indices = [1, 6, 11, 0, 5, 10, 15, 4, 9, 14, 3, 8, 13, 2, 7, 12]
-        round_two_m = []
-
-        for index in round_two_m_indices:
-            round_two_m.append(round_one_m[index])
-
-        # Initialization vectors
-        a = round_one_output[0]
-        b = round_one_output[1]
-        c = round_one_output[2]
-        d = round_one_output[3]
-
-        round_two_shift_map = {0: 5, 4: 5, 8: 5, 12: 5,
-                               1: 9, 5: 9, 9: 9, 13: 9,
-                               2: 14, 6: 14, 10: 14, 14: 14,
-                               3: 20, 7: 20, 11: 20, 15: 20}
-
-        round_two_k_values = k_values[16:]
-
-        # Output: 4 new initialization vectors (str) for Round 3 as new A, B, C, D
-        round_two_output = _round_two(a, b, c, d, round_two_m, round_two_shift_map, round_two_k_values)
-
+    # Per-stage timings are only recorded when instrumentation is enabled (see instrumentation.py)
+    if instrumentation.enabled:
+        return _hash_instrumented(input_string)
 
-        # ROUND 3 DATA LOADING
+    # ORGANIZING ORIGINAL INPUT INTO COMPACT (BYTE-BACKED) BLOCKS
+    block_collection = BlockCollection(utils.get_bytes(input_string), lazy=True)
 
-        # M inputs loaded in the following order
-        round_three_m_indices = [5, 8, 11, 14, 1, 4, 7, 10, 13, 0, 3, 6, 9, 12, 15, 2]
-        round_three_m = []
-
-        for index in round_three_m_indices:
-            round_three_m.append(round_one_m[index])
-
-        # Initialization vectors
-        a = round_two_output[0]
-        b = round_two_output[1]
-        c = round_two_output[2]
-        d = round_two_output[3]
-
-        round_three_shift_map = {0: 4, 4: 4, 8: 4, 12: 4,
-                                 1: 11, 5: 11, 9: 11, 13: 11,
-                                 2: 16, 6: 16, 10: 16, 14: 16,
-                                 3: 13, 7: 13, 11: 13, 15: 13}
-
-        round_three_k_values = round_two_k_values[16:]
-
-        # Output: 4 new initialization vectors (str) for Round 4 as new A, B, C, D
-        round_three_output = _round_three(a, b, c, d, round_three_m, round_three_shift_map, round_three_k_values)
-
-
-        # ROUND 4 DATA LOADING
-
-        # M inputs loaded in the following order
-        round_four_m_indices = [0, 7, 14, 5, 12, 3, 10, 1, 8, 15, 6, 13, 4, 11, 2, 9]
-        round_four_m = []
-
-        for index in round_four_m_indices:
-            round_four_m.append(round_one_m[index])
-
-        # Initialization vectors
-        a = round_three_output[0]
-        b = round_three_output[1]
-        c = round_three_output[2]
-        d = round_three_output[3]
-
-        round_four_shift_map = {0: 6, 4: 6, 8: 6, 12: 6,
-                                1: 10, 5: 10, 9: 10, 13: 10,
-                                2: 15, 6: 15, 10: 15, 14: 15,
-                                3: 21, 7: 21, 11: 21, 15: 21}
-
-        round_four_k_values = round_three_k_values[16:]
-
-        # Output: 4 new initialization vectors (str) for Round 4 as new A, B, C, D
-        round_four_output = _round_four(a, b, c, d, round_four_m, round_four_shift_map, round_four_k_values)
-
-        a = round_four_output[0]
-        b = round_four_output[1]
-        c = round_four_output[2]
-        d = round_four_output[3]
-
-        # RUN WRAP-UP OPERATIONS
-        a = _wrap_up_operation(a, originals[0])
-        b = _wrap_up_operation(b, originals[1])
-        c = _wrap_up_operation(c, originals[2])
-        d = _wrap_up_operation(d, originals[3])
+    # Initialization vectors
+    state = INITIAL_VECTORS
 
-    a = ('0' * (8 - len(a))) + a
-    b = ('0' * (8 - len(b))) + b
-    c = ('0' * (8 - len(c))) + c
-    d = ('0' * (8 - len(d))) + d
+    # Apply all block operations on each block (see diagram), feeding the resultant vectors into the next block
+    for block in block_collection:
+        state = compress(state, block.get_m_values())
 
-    return a + b + c + d
+    return _format_digest(state)
 
 
-def _round_one(a: str, b: str, c: str, d: str, m_values: list[str], shift_map: dict[int, int], k_values: list[str]) -> \
-        tuple[str, str, str, str]:
+def _hash_instrumented(input_string: str) -> str:
     """
-    Runs the first round of operations using the initialized values in the main, thereby executing each of the
-    "red" boxes that must be run for each round (see diagram).
+    Same as hash, but records the number of calls and the time spent in each stage with instrumentation.record.
     """
-    for i in range(16):
-        f_output = _f_function(b, c, d)
-        # Get the first operation box output to feed into the next box
-        red_one_output = _red_one(f_output, a)
-        # Using the first operation's output, get the second operation box output to feed into the next box
-        # Here, we use one of the M-constants indexed based on the current iteration
-        red_two_output = _red_two(red_one_output, m_values[i])
-        # Using the second operation's output, get the third operation box output to feed into the next box
-        # Here, we use one of the K-constants indexed based on the current iteration
-        red_three_output = _red_three(red_two_output, k_values[i])
-        # Apply a left-shift based on current shift amount from shift map
-        left_shift_output = _left_shift(red_three_output, shift_map[i])
-        red_four_output = _red_four(left_shift_output, b)
-        # Assign appropriate a, b, c, and d for the next iteration (see diagram)
-        a, b, c, d = d, red_four_output, b, c
-
-    return (a, b, c, d)
-
-
-def _f_function(b: str, c: str, d: str) -> str:
+    clock = time.perf_counter
+    start = clock()
+
+    input_bytes = utils.get_bytes(input_string)
+    encoded = clock()
+    instrumentation.record('encode', encoded - start)
+
+    blocks = iter(BlockCollection(input_bytes, lazy=True))
+    state = INITIAL_VECTORS
+    block_seconds = m_value_seconds = compress_seconds = 0.0
+    block_count = 0
+    while True:
+        before = clock()
+        block = next(blocks, None)
+        built = clock()
+        block_seconds += built - before
+        if block is None:
+            break
+        m_values = block.get_m_values()
+        unpacked = clock()
+        state = compress(state, m_values)
+        compressed = clock()
+        m_value_seconds += unpacked - built
+        compress_seconds += compressed - unpacked
+        block_count += 1
+    instrumentation.record('blocks', block_seconds, block_count)
+    instrumentation.record('m_values', m_value_seconds, block_count)
+    instrumentation.record('compress', compress_seconds, block_count)
+
+    before = clock()
+    result = _format_digest(state)
+    end = clock()
+    instrumentation.record('format', end - before)
+    instrumentation.record('total', end - start)
+    return result
+
+
+def compress_reference(state: tuple[int, int, int, int], m_values: tuple[int, ...] | list[int]) -> \
+        tuple[int, int, int, int]:
     """
-    Takes in the B, C, and D initialization vectors and runs boolean algebra operation to return single str output.
+    Runs all four rounds (64 operations) on ONE 512-bit block and applies the wrap-up operations, returning the new
+    A, B, C, D vectors to feed into the next block.
 
-    Sub-operation 1.
-    """
-    return (b and c) or (not b and d)
+    <state> holds the A, B, C, D vectors before this block and <m_values> holds the block's sixteen 32-bit M-values.
 
+    This is the REFERENCE compression function, written as one loop per round (see diagram). compress_unrolled
+    computes the same result from generated straight-line code.
 
-def _round_two(a: str, b: str, c: str, d: str, m_values: list[str], shift_map: dict[int, int], k_values: list[str]) -> \
-        tuple[str, str, str, str]:
-    """
-    Runs the second round of operations using the initialized values in the main, thereby executing each of the
-    "red" boxes that must be run for each round (see diagram).
+    >>> state = compress_reference(INITIAL_VECTORS, [0x80] + [0] * 15)
+    >>> _format_digest(state)
+    'd41d8cd98f00b204e9800998ecf8427e'
     """
-    for i in range(16):
-        g_output = _g_function(b, c, d)
-        # Get the first operation box output to feed into the next box
-        red_one_output = _red_one(g_output, a)
-        # Using the first operation's output, get the second operation box output to feed into the next box
-        # Here, we use one of the M-constants indexed based on the current iteration
-        red_two_output = _red_two(red_one_output, m_values[i])
-        # Using the second operation's output, get the third operation box output to feed into the next box
-        # Here, we use one of the K-constants indexed based on the current iteration
-        red_three_output = _red_three(red_two_output, k_values[i])
-        # Apply a left-shift based on current shift amount from shift map
-        left_shift_output = _left_shift(red_three_output, shift_map[i])
-        red_four_output = _red_four(left_shift_output, b)
-        # Assign appropriate a, b, c, and d for the next iteration (see diagram)
-        a, b, c, d = d, red_four_output, b, c
+    a, b, c, d = state
 
-    return (a, b, c, d)
+    # Output: 4 new initialization vectors (int) for the next round as new A, B, C, D
+    a, b, c, d = _round_one(a, b, c, d, m_values)
+    a, b, c, d = _round_two(a, b, c, d, m_values)
+    a, b, c, d = _round_three(a, b, c, d, m_values)
+    a, b, c, d = _round_four(a, b, c, d, m_values)
 
+    # RUN WRAP-UP OPERATIONS
+    return (_wrap_up_operation(a, state[0]),
+            _wrap_up_operation(b, state[1]),
+            _wrap_up_operation(c, state[2]),
+            _wrap_up_operation(d, state[3]))
 
-def _g_function(b: str, c: str, d: str) -> str:
-    """
-    Takes in the B, C, and D initialization vectors and runs boolean algebra operation to return single str output.
 
-    Sub-operation 1.
+def _round_one(a: int, b: int, c: int, d: int, m_values: tuple[int, ...] | list[int]) -> tuple[int, int, int, int]:
     """
-    return (b and d) or (c and not d)
-
+    Runs the first round of operations on the A, B, C, D vectors, thereby executing each of the "red" boxes that must
+    be run for each round (see diagram).
 
-def _round_three(a: str, b: str, c: str, d: str, m_values: list[str], shift_map: dict[int, int], k_values: list[str]) \
-        -> tuple[str, str, str, str]:
-    """
-    Runs the third round of operations using the initialized values in the main, thereby executing each of the
-    "red" boxes that must be run for each round (see diagram).
+    The F function is (B AND C) OR (NOT B AND D).
     """
     for i in range(16):
-        h_output = _h_function(b, c, d)
-        # Get the first operation box output to feed into the next box
-        red_one_output = _red_one(h_output, a)
-        # Using the first operation's output, get the second operation box output to feed into the next box
-        # Here, we use one of the M-constants indexed based on the current iteration
-        red_two_output = _red_two(red_one_output, m_values[i])
-        # Using the second operation's output, get the third operation box output to feed into the next box
-        # Here, we use one of the K-constants indexed based on the current iteration
-        red_three_output = _red_three(red_two_output, k_values[i])
-        # Apply a left-shift based on current shift amount from shift map
-        left_shift_output = _left_shift(red_three_output, shift_map[i])
-        red_four_output = _red_four(left_shift_output, b)
-        # Assign appropriate a, b, c, and d for the next iteration (see diagram)
-        a, b, c, d = d, red_four_output, b, c
+        # Sub-operations 1 to 4: F function, then modular addition of A, the M-value and the K-value
+        total = (a + ((b & c) | (~b & d)) + m_values[i] + K_VALUES[i]) & WORD_MASK
+        # Sub-operation 5: left rotation based on current shift amount
+        shift = ROUND_ONE_SHIFTS[i & 3]
+        rotated = ((total << shift) | (total >> (32 - shift))) & WORD_MASK
+        # Sub-operation 6: modular addition of B, then assign a, b, c, and d for the next iteration (see diagram)
+        a, b, c, d = d, (b + rotated) & WORD_MASK, b, c
 
     return (a, b, c, d)
 
 
-def _h_function(b: str, c: str, d: str) -> str:
+def _round_two(a: int, b: int, c: int, d: int, m_values: tuple[int, ...] | list[int]) -> tuple[int, int, int, int]:
     """
-    Takes in the B, C, and D initialization vectors and runs boolean algebra operation to return single str output.
-
-    Sub-operation 1.
-    >>> b = 'd5071367'
-    >>> c = 'c058ade2'
-    >>> d = '63c603d7'
+    Runs the second round of operations on the A, B, C, D vectors, thereby executing each of the "red" boxes that must
+    be run for each round (see diagram).
 
-    >>> e = _h_function(b, c, d)
-    >>> e
-    '7699bd52'
-    """
-    # CONVERT HEXADECIMAL TO NUMERIC FORM
-    b = int(b, 16)
-    c = int(c, 16)
-    d = int(d, 16)
-
-    result_as_hex_str = hex(b ^ c ^ d)
-    return result_as_hex_str[2:]
-
-
-def _round_four(a: str, b: str, c: str, d: str, m_values: list[str], shift_map: dict[int, int], k_values: list[str]) \
-        -> tuple[str, str, str, str]:
-    """
-    Runs the fourth round of operations using the initialized values in the main, thereby executing each of the
-    "red" boxes that must be run for each round (see diagram).
+    The G function is (B AND D) OR (C AND NOT D).
     """
     for i in range(16):
-        i_output = _i_function(b, c, d)
-        # Get the first operation box output to feed into the next box
-        red_one_output = _red_one(i_output, a)
-        # Using the first operation's output, get the second operation box output to feed into the next box
-        # Here, we use one of the M-constants indexed based on the current iteration
-        red_two_output = _red_two(red_one_output, m_values[i])
-        # Using the second operation's output, get the third operation box output to feed into the next box
-        # Here, we use one of the K-constants indexed based on the current iteration
-        red_three_output = _red_three(red_two_output, k_values[i])
-        # Apply a left-shift based on current shift amount from shift map
-        left_shift_output = _left_shift(red_three_output, shift_map[i])
-        red_four_output = _red_four(left_shift_output, b)
-        # Assign appropriate a, b, c, and d for the next iteration (see diagram)
-        a, b, c, d = d, red_four_output, b, c
+        # Sub-operations 1 to 4: G function, then modular addition of A, the M-value and the K-value
+        total = (a + ((b & d) | (c & ~d)) + m_values[ROUND_TWO_M_INDICES[i]] + K_VALUES[16 + i]) & WORD_MASK
+        # Sub-operation 5: left rotation based on current shift amount
+        shift = ROUND_TWO_SHIFTS[i & 3]
+        rotated = ((total << shift) | (total >> (32 - shift))) & WORD_MASK
+        # Sub-operation 6: modular addition of B, then assign a, b, c, and d for the next iteration (see diagram)
+        a, b, c, d = d, (b + rotated) & WORD_MASK, b, c
 
     return (a, b, c, d)
 
 
-def _i_function(b: str, c: str, d: str) -> str:
+def _round_three(a: int, b: int, c: int, d: int, m_values: tuple[int, ...] | list[int]) -> tuple[int, int, int, int]:
     """
-    Takes in the B, C, and D initialization vectors and runs boolean algebra operation to return single str output.
+    Runs the third round of operations on the A, B, C, D vectors, thereby executing each of the "red" boxes that must
+    be run for each round (see diagram).
 
-    Sub-operation 1.
-    >>> b = '7d502063'
-    >>> c = '8b3d715d'
-    >>> d = '1de3a739'
-
-    >>> e = _i_function(b, c, d)
-    >>> e
-    'f66d513e'
+    The H function is B XOR C XOR D.
     """
-    # CONVERT HEXADECIMAL TO NUMERIC FORM
-    b = int(b, 16)
-    c = int(c, 16)
-    d = int(d, 16)
+    for i in range(16):
+        # Sub-operations 1 to 4: H function, then modular addition of A, the M-value and the K-value
+        total = (a + (b ^ c ^ d) + m_values[ROUND_THREE_M_INDICES[i]] + K_VALUES[32 + i]) & WORD_MASK
+        # Sub-operation 5: left rotation based on current shift amount
+        shift = ROUND_THREE_SHIFTS[i & 3]
+        rotated = ((total << shift) | (total >> (32 - shift))) & WORD_MASK
+        # Sub-operation 6: modular addition of B, then assign a, b, c, and d for the next iteration (see diagram)
+        a, b, c, d = d, (b + rotated) & WORD_MASK, b, c
 
-    result_as_hex_str = hex(c ^ (b or not d))
-    return result_as_hex_str[2:]
+    return (a, b, c, d)
 
 
-def _red_one(func_output: str, a: str) -> str:
+def _round_four(a: int, b: int, c: int, d: int, m_values: tuple[int, ...] | list[int]) -> tuple[int, int, int, int]:
     """
-    Takes in the output from the respective round's Function (F, G, H, I) and combines with initialization vector A and
-    applies modular addition to return a single str output. This is the first red modular arithmetic box.
-
-    Sub-operation 2.
+    Runs the fourth round of operations on the A, B, C, D vectors, thereby executing each of the "red" boxes that must
+    be run for each round (see diagram).
 
-    >>> a = '01234567'
-    >>> func_output = 'fedcba98'
-    >>> ret = _red_one(func_output, a)
-    >>> ret
+    The I function is C XOR (B OR NOT D).
     """
-    x = int(a, 16)
-    y = int(func_output, 16)
-    z = 100000000
+    for i in range(16):
+        # Sub-operations 1 to 4: I function, then modular addition of A, the M-value and the K-value
+        total = (a + (c ^ (b | (~d & WORD_MASK))) + m_values[ROUND_FOUR_M_INDICES[i]] + K_VALUES[48 + i]) & WORD_MASK
+        # Sub-operation 5: left rotation based on current shift amount
+        shift = ROUND_FOUR_SHIFTS[i & 3]
+        rotated = ((total << shift) | (total >> (32 - shift))) & WORD_MASK
+        # Sub-operation 6: modular addition of B, then assign a, b, c, and d for the next iteration (see diagram)
+        a, b, c, d = d, (b + rotated) & WORD_MASK, b, c
 
-    return hex((x + y) % z)[2:]
+    return (a, b, c, d)
 
 
-def _red_two(red_one_output: str, m_value: str) -> str:
+def _wrap_up_operation(final_output: int, oiv: int) -> int:
     """
-    Takes in the output from the first red modular arithmetic box and combines with the current m_value and applies
-    modular addition to return a single str output. This is the second red modular arithmetic box.
+    Takes in the final output (one vector at a time) from all 64 operations (4 rounds) and combines with ORIGINAL
+    respective initialization vector and applies modular addition to return a single int output.
 
-    Sub-operation 3.
+    FINAL OPERATION PRE-VECTOR-CONCATENATION.
     """
-    x = int(m_value, 16)
-    y = int(red_one_output, 16)
-    z = 100000000
-
-    return hex((x + y) % z)[2:]
+    return (final_output + oiv) & WORD_MASK
 
 
-def _red_three(red_two_output: str, k_value: str) -> str:
+def _format_digest(state: tuple[int, int, int, int]) -> str:
     """
-    Takes in the output from the second red modular arithmetic box and combines with the current k_value and applies
-    modular addition to return a single str output. This is the third red modular arithmetic box.
+    Concatenates the final A, B, C, D vectors into the 32-character hexadecimal hash. Each vector is written out in
+    little-endian byte order as per MD5 format. This is the ONLY place where the vectors are formatted as hexadecimal.
 
-    Sub-operation 4.
+    >>> _format_digest((0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476))
+    '0123456789abcdeffedcba9876543210'
     """
-    x = int(k_value, 16)
-    y = int(red_two_output, 16)
-    z = 100000000
+    return ''.join(vector.to_bytes(4, 'little').hex() for vector in state)
 
-    return hex((x + y) % z)[2:]
 
-
-def _left_shift(red_three_output: str, shift_val: int) -> str:
-    """
-    Takes in the output from the third red modular arithmetic box, converts it to binary, shifts the bit shift_val
-    spaces to the left, then converts back to hexadecimal as a single str output.
-
-    Sub-operation 5.
-    >>> red_three_output = '2bd309f0'
-    >>> shift_val = 7
-    >>> output = _left_shift(red_three_output, shift_val)
-    >>> output
-    'e984f815'
+def _generate_unrolled_source() -> str:
     """
-    # CONVERT HEXADECIMAL TO BINARY
-    # Set up constants table; REFERENCE: https://stackoverflow.com/questions/1425493/convert-hex-to-binary
-    HEX_TO_BINARY_CONVERSION_TABLE = {'0': '0000', '1': '0001', '2': '0010', '3': '0011', '4': '0100', '5': '0101',
-                                      '6': '0110', '7': '0111', '8': '1000', '9': '1001', 'a': '1010', 'b': '1011',
-                                      'c': '1100', 'd': '1101', 'e': '1110', 'f': '1111'}
+    Returns the source code of compress_unrolled: all 64 operations written out one after the other, with the
+    K-constants, shift amounts and M-value indices of every operation baked in as literals.
 
-    binary_str = ''.join([HEX_TO_BINARY_CONVERSION_TABLE[char.lower()] for char in red_three_output])
-
-    # APPLY SHIFT
-    copy = binary_str[:shift_val]
-    binary_str = binary_str[shift_val:] + copy
-
-    # REFERENCE: https://stackoverflow.com/questions/2072351/python-conversion-from-binary-string-to-hexadecimal
-    hexa_str = f'{int(binary_str, 2):X}'
-    return hexa_str.lower()
-
-
-def _red_four(left_shift_output: str, b: str) -> str:
+    Instead of moving the vectors along after every operation (a, b, c, d = d, new_b, b, c), the operations rotate
+    which of the a, b, c, d names they write to, so every operation is a single pair of assignments.
     """
-    Takes in the output from the left shift and combines with initialization vector B and applies
-    modular addition to return a single str output. This is the fourth red modular arithmetic box.
-
-    Sub-operation 6.
+    round_functions = ['(({b} & {c}) | (~{b} & {d}))',
+                       '(({b} & {d}) | ({c} & ~{d}))',
+                       '({b} ^ {c} ^ {d})',
+                       '({c} ^ ({b} | (~{d} & 0xFFFFFFFF)))']
+    m_indices = ROUND_ONE_M_INDICES + ROUND_TWO_M_INDICES + ROUND_THREE_M_INDICES + ROUND_FOUR_M_INDICES
+    shifts = [ROUND_ONE_SHIFTS, ROUND_TWO_SHIFTS, ROUND_THREE_SHIFTS, ROUND_FOUR_SHIFTS]
+
+    lines = ['def compress_unrolled(state, m_values):',
+             '    m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11, m12, m13, m14, m15 = m_values',
+             '    a, b, c, d = state']
+    names = ['a', 'b', 'c', 'd']
+    for i in range(64):
+        a, b, c, d = names
+        func_output = round_functions[i // 16].format(b=b, c=c, d=d)
+        shift = shifts[i // 16][i & 3]
+        lines.append(f'    t = ({a} + {func_output} + m{m_indices[i]} + 0x{K_VALUES[i]:08X}) & 0xFFFFFFFF')
+        lines.append(f'    {a} = ({b} + (((t << {shift}) | (t >> {32 - shift})) & 0xFFFFFFFF)) & 0xFFFFFFFF')
+        names = [d, a, b, c]
+    lines.append('    return ((a + state[0]) & 0xFFFFFFFF, (b + state[1]) & 0xFFFFFFFF, '
+                 '(c + state[2]) & 0xFFFFFFFF, (d + state[3]) & 0xFFFFFFFF)')
+    return '\n'.join(lines) + '\n'
+
+
+_namespace = {}
+exec(compile(_generate_unrolled_source(), '<compress_unrolled>', 'exec'), _namespace)
+compress_unrolled = _namespace['compress_unrolled']
+compress_unrolled.__doc__ = """
+    Runs all four rounds (64 operations) on ONE 512-bit block and applies the wrap-up operations, returning the new
+    A, B, C, D vectors to feed into the next block. Same result as compress_reference, but generated at import time as
+    straight-line code with no per-operation table lookups (see _generate_unrolled_source).
     """
-    x = int(b, 16)
-    y = int(left_shift_output, 16)
-    z = 100000000
 
-    return hex((x + y) % z)[2:]
+# All available compression functions, selectable by name with set_compressor
+COMPRESSORS = {'reference': compress_reference, 'unrolled': compress_unrolled}
 
+# The compression function used by hash and every other hashing path built on hash_main
+compress = compress_unrolled
 
-def _wrap_up_operation(final_output: str, oiv: str) -> str:
-    """
-    Takes in the final output (one vector at a time) from all 64 operations (4 rounds) and combines with ORIGINAL
-    respective initialization vector and applies modular addition to return a single str output.
 
-    FINAL OPERATION PRE-VECTOR-CONCATENATION.
+def set_compressor(name: str) -> None:
     """
-    x = int(final_output, 16)
-    y = int(oiv, 16)
-    z = 100000000
+    Selects the compression function (see COMPRESSORS) used by hash and by every other hashing path that calls
+    hash_main.compress.
 
-    return hex((x + y) % z)[2:]
+    >>> set_compressor('reference')
+    >>> hash('abc')
+    '900150983cd24fb0d6963f7d28e17f72'
+    >>> set_compressor('unrolled')
+    """
+    global compress
+    if name not in COMPRESSORS:
+        raise ValueError(f'Unknown compressor {name!r}; expected one of {sorted(COMPRESSORS)}')
+    compress = COMPRESSORS[name]
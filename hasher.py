@@ -0,0 +1,107 @@
+import struct
+
+import hash_main
+import utils
+
+
+class MD5Hasher:
+    """
+    An incremental MD5 hasher that consumes its input piece by piece instead of as one complete string.
+
+    Full 512-bit blocks are compressed as soon as they arrive, so at most one partial 64-byte block is ever buffered
+    and memory stays constant regardless of the length of the input. Padding is only applied when a digest is
+    requested, and requesting a digest does NOT finalize the hasher (more data may still be added afterwards).
+
+    >>> hasher = MD5Hasher()
+    >>> hasher.update('They are ')
+    >>> hasher.update(b'deterministic')
+    >>> hasher.hexdigest()
+    '23db6982caef9e9152f1a5b2589e6ca3'
+
+    === REPRESENTATION INVARIANTS ===
+    len(buffer) < 64
+    message_length % 64 == len(buffer)
+    """
+
+    state: tuple[int, int, int, int]
+    buffer: bytearray
+    message_length: int
+
+    def __init__(self, data: bytes | str = b'') -> None:
+        """
+        Creates an MD5Hasher instance, optionally starting it with <data>.
+        """
+        self.state = hash_main.INITIAL_VECTORS
+        self.buffer = bytearray()
+        self.message_length = 0
+
+        if data:
+            self.update(data)
+
+    def update(self, data: bytes | bytearray | memoryview | str) -> None:
+        """
+        Adds <data> to the message being hashed. Strings are converted to bytes using ASCII reference, the same way
+        hash_main.hash does.
+        """
+        if isinstance(data, str):
+            data = utils.get_bytes(data)
+        view = memoryview(data).cast('B')
+        self.message_length += len(view)
+
+        offset = 0
+        # Top up a previously buffered partial block first
+        if self.buffer:
+            offset = min(64 - len(self.buffer), len(view))
+            self.buffer += view[:offset]
+            if len(self.buffer) < 64:
+                return
+            self.state = hash_main.compress(self.state, struct.unpack('<16I', self.buffer))
+            self.buffer.clear()
+
+        # Compress every full block straight out of the input without copying it
+        state = self.state
+        end = len(view) - 64
+        while offset <= end:
+            state = hash_main.compress(state, struct.unpack_from('<16I', view, offset))
+            offset += 64
+        self.state = state
+
+        self.buffer += view[offset:]
+
+    def digest(self) -> bytes:
+        """
+        Returns the 16-byte MD5 digest of all the data added so far.
+        """
+        state = self.state
+        final_blocks = bytes(self.buffer) + get_padding(self.message_length)
+        for offset in range(0, len(final_blocks), 64):
+            state = hash_main.compress(state, struct.unpack_from('<16I', final_blocks, offset))
+        return struct.pack('<4I', *state)
+
+    def hexdigest(self) -> str:
+        """
+        Returns the MD5 digest of all the data added so far as a 32-character hexadecimal string.
+        """
+        return self.digest().hex()
+
+    def copy(self) -> 'MD5Hasher':
+        """
+        Returns an independent copy of this hasher, e.g. to hash several messages that share a common prefix.
+        """
+        other = MD5Hasher.__new__(MD5Hasher)
+        other.state = self.state
+        other.buffer = self.buffer.copy()
+        other.message_length = self.message_length
+        return other
+
+
+def get_padding(message_length: int) -> bytes:
+    """
+    Returns the MD5 padding for a message of <message_length> bytes: a single 1 bit, 0 bits up to 448 bits modulo 512,
+    then the original length in bits as a 64-bit little-endian integer.
+
+    >>> len(get_padding(0)), len(get_padding(55)), len(get_padding(56))
+    (64, 9, 72)
+    """
+    number_of_zeros = (55 - message_length) % 64
+    return b'\x80' + b'\x00' * number_of_zeros + ((message_length * 8) & 0xFFFFFFFFFFFFFFFF).to_bytes(8, 'little')
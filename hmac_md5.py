@@ -0,0 +1,84 @@
+import hmac
+import struct
+from typing import Iterable
+
+import hash_main
+import utils
+from hasher import MD5Hasher, get_padding
+
+# MD5 block size in bytes, and the bytes XORed into the key block for the inner and outer hashes (RFC 2104)
+BLOCK_SIZE = 64
+INNER_PAD = 0x36
+OUTER_PAD = 0x5C
+
+# The outer hash always covers one key block plus a 16-byte inner digest, so its padding never changes
+_OUTER_PADDING = get_padding(BLOCK_SIZE + 16)
+
+
+class HMACKey:
+    """
+    An HMAC-MD5 key (RFC 2104) whose inner and outer key blocks are compressed once, when the key is created.
+
+    inner and outer are MD5Hashers that have already consumed the ipad- and opad-XORed key blocks. Signing a message
+    resumes from copies of them, so it only compresses the message's own blocks plus one outer block.
+
+    >>> HMACKey(b'key').hexdigest(b'The quick brown fox jumps over the lazy dog')
+    '80070713463e7749b90c2dc24911e275'
+
+    === REPRESENTATION INVARIANTS ===
+    inner.message_length == outer.message_length == BLOCK_SIZE
+    """
+
+    inner: MD5Hasher
+    outer: MD5Hasher
+
+    def __init__(self, key: bytes | str) -> None:
+        """
+        Creates an HMACKey instance for <key>. Keys longer than one block are hashed first, as RFC 2104 requires.
+        """
+        key = utils.get_bytes(key) if isinstance(key, str) else bytes(key)
+        if len(key) > BLOCK_SIZE:
+            key = MD5Hasher(key).digest()
+        key = key.ljust(BLOCK_SIZE, b'\x00')
+        self.inner = MD5Hasher(bytes(byte ^ INNER_PAD for byte in key))
+        self.outer = MD5Hasher(bytes(byte ^ OUTER_PAD for byte in key))
+
+    def digest(self, message: bytes | str) -> bytes:
+        """
+        Returns the raw 16-byte HMAC-MD5 of <message>.
+        """
+        inner = self.inner.copy()
+        inner.update(message)
+        state = hash_main.compress(self.outer.state, struct.unpack('<16I', inner.digest() + _OUTER_PADDING))
+        return struct.pack('<4I', *state)
+
+    def hexdigest(self, message: bytes | str) -> str:
+        """
+        Returns the HMAC-MD5 of <message> as a 32-character hexadecimal string.
+        """
+        return self.digest(message).hex()
+
+    def verify(self, message: bytes | str, signature: bytes | str) -> bool:
+        """
+        Returns true if <signature> (raw or hexadecimal) is the HMAC-MD5 of <message>, comparing in constant time.
+        """
+        if isinstance(signature, str):
+            return hmac.compare_digest(self.hexdigest(message), signature.lower())
+        return hmac.compare_digest(self.digest(message), signature)
+
+    def verify_many(self, signed_messages: Iterable[tuple[bytes | str, bytes | str]]) -> list[bool]:
+        """
+        Verifies every (message, signature) pair in <signed_messages> with this key and returns the results in order.
+        """
+        return [self.verify(message, signature) for message, signature in signed_messages]
+
+
+def hmac_md5(key: bytes | str, message: bytes | str) -> str:
+    """
+    Returns the HMAC-MD5 of <message> under <key> as a 32-character hexadecimal string. Create an HMACKey instead to
+    sign or verify many messages with the same key.
+
+    >>> hmac_md5(b'', b'')
+    '74e6f7298a9c2d168935f58c001bad88'
+    """
+    return HMACKey(key).hexdigest(message)
@@ -0,0 +1,78 @@
+"""
+Opt-in per-stage timing for hash_main.hash.
+
+While disabled (the default), hash_main.hash only pays for one flag check. Once enabled, every call records the number
+of calls and the cumulative time spent in each stage:
+
+    encode    converting the input string to bytes (utils)
+    blocks    constructing the 512-bit blocks (BlockCollection)
+    m_values  unpacking the M-values of each block
+    compress  the four rounds and wrap-up operations of each block
+    format    formatting the final A, B, C, D vectors as the hash
+    total     the whole hash call
+"""
+
+enabled = False
+
+# stage name -> [number of calls, cumulative seconds]
+_stats: dict[str, list] = {}
+
+
+def enable() -> None:
+    """
+    Starts recording stage timings for every hash_main.hash call.
+    """
+    global enabled
+    enabled = True
+
+
+def disable() -> None:
+    """
+    Stops recording stage timings. The timings recorded so far are kept.
+    """
+    global enabled
+    enabled = False
+
+
+def reset() -> None:
+    """
+    Discards every timing recorded so far.
+    """
+    _stats.clear()
+
+
+def record(stage: str, seconds: float, calls: int = 1) -> None:
+    """
+    Adds <calls> calls taking <seconds> in total to the timings of <stage>.
+    """
+    stat = _stats.get(stage)
+    if stat is None:
+        _stats[stage] = [calls, seconds]
+    else:
+        stat[0] += calls
+        stat[1] += seconds
+
+
+def get_stats() -> dict[str, dict[str, float]]:
+    """
+    Returns the recorded timings in the form {stage: {'calls': number of calls, 'seconds': cumulative seconds}}.
+
+    >>> reset()
+    >>> record('compress', 0.5)
+    >>> record('compress', 0.25)
+    >>> get_stats()
+    {'compress': {'calls': 2, 'seconds': 0.75}}
+    """
+    return {stage: {'calls': calls, 'seconds': seconds} for stage, (calls, seconds) in _stats.items()}
+
+
+def report() -> str:
+    """
+    Returns the recorded timings as a table, with each stage's share of the total time.
+    """
+    total = _stats.get('total', [0, 0.0])[1]
+    lines = [f"{'STAGE':<10} {'CALLS':>10} {'SECONDS':>12} {'SHARE':>7}"]
+    for stage, (calls, seconds) in _stats.items():
+        share = f'{seconds / total:.1%}' if total else '-'
+        lines.append(f'{stage:<10} {calls:>10} {seconds:>12.6f} {share:>7}')
+    return '\n'.join(lines)
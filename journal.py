@@ -0,0 +1,383 @@
+import os
+import struct
+import threading
+import zlib
+from typing import BinaryIO, Iterator
+
+from digest_store import DIGEST_WIDTH, CompactDigestStore, DigestRecord
+
+# File names inside a journal directory
+JOURNAL_FILE = 'accounts.journal'
+SNAPSHOT_FILE = 'accounts.snapshot'
+
+# Leading byte of an entry holding a stored-password string instead of a raw digest (usernames are shorter than this)
+_STORED_MARKER = 0xFF
+
+# Snapshot layout: header, (journal offset, entry count), entries, CRC-32 of everything before it
+SNAPSHOT_HEADER = b'MD5SNAP1'
+_SNAPSHOT_META = struct.Struct('<QQ')
+_CRC = struct.Struct('<I')
+
+# Appended records are fsynced once this many are pending, or once the oldest pending one is this old
+DEFAULT_SYNC_EVERY = 256
+DEFAULT_SYNC_INTERVAL = 0.05
+
+# A snapshot is written automatically once this many records were appended since the last one (0 disables it)
+DEFAULT_SNAPSHOT_EVERY = 100000
+
+
+class JournaledDigestStore(CompactDigestStore):
+    """
+    A CompactDigestStore persisted with an append-only journal and periodic snapshots, for LoginSystem.
+
+    Every new or changed account is appended to the journal as one small checksummed record and handed to the OS
+    straight away, so a crash of the process never loses it. Only the fsyncs are batched: once sync_every records are
+    pending, or by a background timer sync_interval seconds after the first pending record, whichever comes first
+    (flush forces one). A snapshot holds every account in a compact binary file; once it is safely written the
+    journal is emptied, so the journal never holds more than the records appended since the last snapshot, and
+    startup loads the snapshot and replays just those. A torn record at the end of the journal (from a crash
+    mid-append) is discarded on startup.
+
+    Besides raw digests, an account can hold a self-describing stored-password string from password_hashing (e.g.
+    'pbkdf2-md5$...'), kept in stored and journaled as a variable-length entry, so a salted LoginSystem can persist
+    its accounts too. get_digest returns None for such an account.
+
+    === REPRESENTATION INVARIANTS ===
+    Replaying the snapshot, then the journal from snapshot_offset, gives exactly the accounts in this store.
+    _stored_only == number of usernames in stored that have no slot in the compact buffers
+    """
+
+    directory: str
+    sync_every: int
+    sync_interval: float
+    snapshot_every: int
+    snapshot_offset: int
+    stored: dict[str, str]
+    _stored_only: int
+    _journal: BinaryIO | None
+    _pending: int
+    _appended_since_snapshot: int
+    _lock: threading.Lock
+    _timer: threading.Timer | None
+
+    def __init__(self, directory: str | os.PathLike, sync_every: int = DEFAULT_SYNC_EVERY,
+                 sync_interval: float = DEFAULT_SYNC_INTERVAL, snapshot_every: int = DEFAULT_SNAPSHOT_EVERY) -> None:
+        """
+        Opens the journal directory at <directory> (created if missing) and recovers every account stored in it.
+        """
+        super().__init__()
+        self.directory = os.fspath(directory)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.stored = {}
+        self._stored_only = 0
+        self._journal = None
+        self._pending = 0
+        self._appended_since_snapshot = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.snapshot_offset = self._load_snapshot()
+        journal_path = os.path.join(self.directory, JOURNAL_FILE)
+        valid_end = self._replay_journal(journal_path)
+
+        self._journal = open(journal_path, 'ab')
+        if self._journal.tell() != valid_end:
+            # Drop a torn record left by a crash
+            self._journal.truncate(valid_end)
+            self._journal.seek(valid_end)
+
+    def set_digest(self, username: str, digest: bytes) -> None:
+        """
+        Stores the raw 16-byte <digest> for <username> and appends it to the journal.
+        """
+        record = _encode_record(username, digest)
+        if username in self.stored:
+            del self.stored[username]
+            if not super().__contains__(username):
+                self._stored_only -= 1
+        super().set_digest(username, digest)
+        self._append(record)
+
+    def set_stored(self, username: str, stored: str) -> None:
+        """
+        Stores the stored-password string <stored> (see password_hashing) for <username> and appends it to the
+        journal.
+        """
+        record = _encode_record(username, stored)
+        if username not in self.stored and not super().__contains__(username):
+            self._stored_only += 1
+        self.stored[username] = stored
+        self._append(record)
+
+    def _append(self, record: bytes) -> None:
+        """
+        Appends <record> to the journal and hands it to the OS, fsyncing and snapshotting when they are due.
+        """
+        if self._journal is None:
+            # Still recovering: replayed records are already in the journal
+            return
+
+        with self._lock:
+            self._journal.write(record)
+            self._journal.flush()
+            self._pending += 1
+            self._appended_since_snapshot += 1
+            if self._pending >= self.sync_every:
+                self._sync()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.sync_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if self.snapshot_every and self._appended_since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def get_digest(self, username: str) -> bytes | None:
+        """
+        Returns the raw 16-byte digest stored for <username>, or None if there is no such account or it holds a
+        stored-password string.
+        """
+        if username in self.stored:
+            return None
+        return super().get_digest(username)
+
+    def __contains__(self, username: str) -> bool:
+        """
+        Returns true if an account with <username> is stored.
+        """
+        return username in self.stored or super().__contains__(username)
+
+    def __getitem__(self, username: str) -> str:
+        """
+        Returns the stored-password string of <username>, or its digest as a 32-character hexadecimal string.
+        """
+        stored = self.stored.get(username)
+        return super().__getitem__(username) if stored is None else stored
+
+    def __setitem__(self, username: str, hashed_password: str) -> None:
+        """
+        Stores <hashed_password> for <username>: a stored-password string if it contains '$', otherwise a
+        32-character hexadecimal hash.
+        """
+        if '$' in hashed_password:
+            self.set_stored(username, hashed_password)
+        else:
+            super().__setitem__(username, hashed_password)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of accounts stored.
+        """
+        return super().__len__() + self._stored_only
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Yields every username: those with a slot in insertion order, then those holding only a stored-password string.
+        """
+        yield from super().__iter__()
+        for username in self.stored:
+            if not super().__contains__(username):
+                yield username
+
+    def records(self) -> Iterator[DigestRecord]:
+        """
+        Yields a DigestRecord for every account holding a raw digest, in insertion order.
+        """
+        for record in super().records():
+            if record.username not in self.stored:
+                yield record
+
+    def flush(self) -> None:
+        """
+        Fsyncs every pending journal record.
+        """
+        with self._lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        """
+        Fsyncs every pending journal record and stops the sync timer. The caller must hold _lock.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._journal is not None and self._pending:
+            os.fsync(self._journal.fileno())
+            self._pending = 0
+
+    def snapshot(self) -> None:
+        """
+        Writes every account to a new snapshot, replacing the old snapshot atomically, then empties the journal.
+
+        The snapshot covers the whole journal and says so by recording offset 0, so a crash between replacing the
+        snapshot and emptying the journal only replays records the snapshot already holds, which changes nothing.
+        """
+        self.flush()
+        body = bytearray(SNAPSHOT_HEADER)
+        body += _SNAPSHOT_META.pack(0, len(self))
+        for username in self:
+            stored = self.stored.get(username)
+            body += _encode_entry(username, super().get_digest(username) if stored is None else stored)
+        body += _CRC.pack(zlib.crc32(body))
+
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        with open(snapshot_path + '.tmp', 'wb') as file:
+            file.write(body)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(snapshot_path + '.tmp', snapshot_path)
+        _fsync_directory(self.directory)
+
+        with self._lock:
+            self._journal.truncate(0)
+            os.fsync(self._journal.fileno())
+            self.snapshot_offset = 0
+            self._appended_since_snapshot = 0
+
+    def close(self) -> None:
+        """
+        Fsyncs any pending journal records and closes the journal.
+        """
+        with self._lock:
+            if self._journal is not None:
+                self._sync()
+                self._journal.close()
+                self._journal = None
+
+    def _load_snapshot(self) -> int:
+        """
+        Loads every account from the snapshot, if there is one, and returns the journal offset it covers.
+        """
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if not os.path.exists(snapshot_path):
+            return 0
+
+        with open(snapshot_path, 'rb') as file:
+            data = file.read()
+        if data[:len(SNAPSHOT_HEADER)] != SNAPSHOT_HEADER or \
+                _CRC.unpack_from(data, len(data) - _CRC.size)[0] != zlib.crc32(data[:-_CRC.size]):
+            raise ValueError(f'{snapshot_path} is not a valid snapshot')
+
+        journal_offset, count = _SNAPSHOT_META.unpack_from(data, len(SNAPSHOT_HEADER))
+        offset = len(SNAPSHOT_HEADER) + _SNAPSHOT_META.size
+        for _ in range(count):
+            username, value, offset = _decode_entry(data, offset)
+            self._apply(username, value)
+        return journal_offset
+
+    def _apply(self, username: str, value: bytes | str) -> None:
+        """
+        Stores a recovered entry: a raw digest or a stored-password string.
+        """
+        if isinstance(value, str):
+            self.set_stored(username, value)
+        else:
+            self.set_digest(username, value)
+
+    def _replay_journal(self, journal_path: str) -> int:
+        """
+        Replays every journal record written after the snapshot and returns the offset just after the last valid
+        record.
+        """
+        if not os.path.exists(journal_path):
+            return 0
+        with open(journal_path, 'rb') as file:
+            file.seek(self.snapshot_offset)
+            data = file.read()
+
+        end = 0
+        for username, value, end in _decode_records(data):
+            self._apply(username, value)
+            self._appended_since_snapshot += 1
+        return self.snapshot_offset + end
+
+
+def _fsync_directory(directory: str) -> None:
+    """
+    Fsyncs <directory> so that a file renamed into it survives a crash (a no-op where directories cannot be opened).
+    """
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    directory_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
+
+
+def _encode_username(username: str) -> bytes:
+    """
+    Returns <username> as a length byte followed by its UTF-8 bytes.
+    """
+    encoded = username.encode('utf-8')
+    if len(encoded) >= _STORED_MARKER:
+        raise ValueError(f'Usernames must be at most {_STORED_MARKER - 1} bytes long')
+    return bytes([len(encoded)]) + encoded
+
+
+def _encode_entry(username: str, value: bytes | str) -> bytes:
+    """
+    Returns one account as stored in the journal and in snapshots: the encoded username followed by the raw digest,
+    or, for a stored-password string, a marker byte, the encoded username, a length byte and the ASCII string.
+    """
+    if isinstance(value, bytes):
+        return _encode_username(username) + value
+    encoded = value.encode('ascii')
+    if len(encoded) > 255:
+        raise ValueError('Stored passwords must be at most 255 characters long')
+    return bytes([_STORED_MARKER]) + _encode_username(username) + bytes([len(encoded)]) + encoded
+
+
+def _decode_entry(data: bytes, offset: int) -> tuple[str, bytes | str, int] | None:
+    """
+    Returns (username, raw digest or stored-password string, offset just after it) for the entry at <offset> in
+    <data>, or None if <data> ends before the entry does.
+    """
+    stored = data[offset] == _STORED_MARKER if offset < len(data) else False
+    offset += stored
+    if offset >= len(data):
+        return None
+    username_end = offset + 1 + data[offset]
+    if not stored:
+        end = username_end + DIGEST_WIDTH
+        return (data[offset + 1:username_end].decode('utf-8'), bytes(data[username_end:end]), end) \
+            if end <= len(data) else None
+    if username_end >= len(data):
+        return None
+    end = username_end + 1 + data[username_end]
+    return (data[offset + 1:username_end].decode('utf-8'), data[username_end + 1:end].decode('ascii'), end) \
+        if end <= len(data) else None
+
+
+def _encode_record(username: str, value: bytes | str) -> bytes:
+    """
+    Returns the journal record for one account: its entry followed by a CRC-32 of the entry.
+    """
+    body = _encode_entry(username, value)
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def _decode_records(data: bytes) -> Iterator[tuple[str, bytes | str, int]]:
+    """
+    Yields (username, raw digest or stored-password string, offset just after the record) for every complete, valid
+    record at the start of <data>, stopping at the first torn or corrupt one.
+
+    >>> record = _encode_record('guest', bytes(16))
+    >>> [(username, end) for username, _, end in _decode_records(record + record[:-1])]
+    [('guest', 26)]
+    >>> [value for _, value, _ in _decode_records(_encode_record('guest', 'pbkdf2-md5$1$00$00'))]
+    ['pbkdf2-md5$1$00$00']
+    """
+    offset = 0
+    while offset < len(data):
+        entry = _decode_entry(data, offset)
+        if entry is None or entry[2] + _CRC.size > len(data):
+            return
+        username, value, entry_end = entry
+        if _CRC.unpack_from(data, entry_end)[0] != zlib.crc32(data[offset:entry_end]):
+            return
+        offset = entry_end + _CRC.size
+        yield username, value, offset
@@ -0,0 +1,17 @@
+import json
+import os
+
+
+def write_json_atomically(path: str | os.PathLike, data: object) -> None:
+    """
+    Replaces the file at <path> with <data> as JSON, atomically: the JSON is written and fsynced to a temporary file
+    next to it, which is then renamed over it, so a crash leaves either the old file or the new one, never a torn
+    one. The file is readable and writable by its owner only, since checkpoints can describe sensitive accounts.
+    """
+    path = os.fspath(path)
+    temporary_path = path + '.tmp'
+    with open(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
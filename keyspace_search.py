@@ -0,0 +1,346 @@
+import argparse
+import json
+import multiprocessing
+import os
+import string
+import struct
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator
+
+import hash_main
+from block import CandidateBlock
+from hasher import MD5Hasher
+from json_files import write_json_atomically
+
+"""
+Keyspace search for AUTHORIZED strength testing of the digests stored by our own LoginSystem.
+
+A keyspace is a sequence of positions, each with the set of characters it can take. Its candidates are numbered in
+order (the last position varies fastest), so the whole keyspace can be split into independent index ranges that are
+searched by separate worker processes.
+"""
+
+# Character classes usable in masks, e.g. '?u?l?l?l?d?d'
+MASK_CLASSES = {'l': string.ascii_lowercase,
+                'u': string.ascii_uppercase,
+                'd': string.digits,
+                's': string.punctuation + ' ',
+                'a': string.ascii_letters + string.digits + string.punctuation + ' '}
+
+# Number of candidates in each independently searched range
+DEFAULT_RANGE_SIZE = 50000
+
+# Minimum number of seconds between two routine checkpoint saves
+DEFAULT_CHECKPOINT_INTERVAL = 10.0
+
+# Number of candidates a worker checks between two looks at the shared stop flag
+_STOP_CHECK_INTERVAL = 4096
+
+_stop_event = None
+
+
+class Keyspace:
+    """
+    A keyspace of fixed-length candidates, given as the characters each position can take. Only ASCII characters are
+    allowed, since hash_main.hash cannot have stored anything else.
+
+    >>> keyspace = Keyspace(['ab', '01'])
+    >>> keyspace.size
+    4
+    >>> [keyspace.candidate(i) for i in range(keyspace.size)]
+    ['a0', 'a1', 'b0', 'b1']
+
+    === REPRESENTATION INVARIANTS ===
+    size == product of len(position) for every position in positions
+    """
+
+    positions: list[str]
+    size: int
+
+    def __init__(self, positions: list[str]) -> None:
+        """
+        Creates a Keyspace instance.
+        """
+        self.positions = list(positions)
+        if not all(position.isascii() for position in self.positions):
+            raise ValueError('Keyspaces can only contain ASCII characters')
+        self.size = 1
+        for position in self.positions:
+            self.size *= len(position)
+
+    def digits(self, index: int) -> list[int]:
+        """
+        Returns the character index at every position of candidate number <index>.
+        """
+        digits = []
+        for position in reversed(self.positions):
+            index, digit = divmod(index, len(position))
+            digits.append(digit)
+        return digits[::-1]
+
+    def candidate(self, index: int) -> str:
+        """
+        Returns candidate number <index>.
+        """
+        return ''.join(position[digit] for position, digit in zip(self.positions, self.digits(index)))
+
+
+def keyspaces_from_charset(charset: str, min_length: int, max_length: int) -> list[Keyspace]:
+    """
+    Returns one Keyspace per candidate length from <min_length> to <max_length>, every position taking any character
+    of <charset>.
+    """
+    return [Keyspace([charset] * length) for length in range(min_length, max_length + 1)]
+
+
+def keyspace_from_mask(mask: str) -> Keyspace:
+    """
+    Returns the Keyspace described by <mask>, where ?l, ?u, ?d, ?s and ?a stand for a character class (see
+    MASK_CLASSES), ?? stands for a literal '?' and any other character stands for itself.
+
+    >>> keyspace_from_mask('?dx??').positions
+    ['0123456789', 'x', '?']
+    """
+    positions = []
+    i = 0
+    while i < len(mask):
+        if mask[i] == '?':
+            if i + 1 >= len(mask) or (mask[i + 1] != '?' and mask[i + 1] not in MASK_CLASSES):
+                raise ValueError(f'Invalid mask {mask!r} at position {i}')
+            positions.append('?' if mask[i + 1] == '?' else MASK_CLASSES[mask[i + 1]])
+            i += 2
+        else:
+            positions.append(mask[i])
+            i += 1
+    return Keyspace(positions)
+
+
+def split_ranges(keyspaces: list[Keyspace], range_size: int, first: int = 0) -> Iterator[tuple[int, int, int, int]]:
+    """
+    Yields every range of at most <range_size> candidates as (range number, keyspace number, first index, end index)
+    in search order, starting from range number <first>. Ranges are numbered across all the keyspaces and generated
+    one at a time, so even keyspaces with billions of candidates never have their ranges held in memory.
+
+    >>> list(split_ranges([Keyspace(['ab']), Keyspace(['abc', 'ab'])], 4))
+    [(0, 0, 0, 2), (1, 1, 0, 4), (2, 1, 4, 6)]
+    >>> list(split_ranges([Keyspace(['ab']), Keyspace(['abc', 'ab'])], 4, first=2))
+    [(2, 1, 4, 6)]
+    """
+    number = 0
+    for keyspace_number, keyspace in enumerate(keyspaces):
+        count = -(-keyspace.size // range_size)
+        for index in range(max(first - number, 0), count):
+            start = index * range_size
+            yield number + index, keyspace_number, start, min(start + range_size, keyspace.size)
+        number += count
+
+
+def search(targets: Iterable[str], keyspaces: list[Keyspace], range_size: int = DEFAULT_RANGE_SIZE,
+           workers: int | None = None, checkpoint_path: str | None = None,
+           checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL) -> dict[str, str | None]:
+    """
+    Searches <keyspaces> for candidates whose hash is one of the 32-character hexadecimal <targets>, and returns a
+    dict mapping every target that was found to its candidate (None for targets found before resuming from a
+    checkpoint).
+
+    The keyspaces are split into ranges of range_size candidates that <workers> processes (one per core if None)
+    search independently. As soon as every target has been found, all workers stop and the remaining ranges are
+    dropped.
+
+    If <checkpoint_path> is given, the progress and every target found (but NEVER its candidate, which only ever
+    lives in memory) are saved there, readable by the owner only, and a search over the same keyspaces with the same
+    range_size resumes by skipping the finished ranges. Progress is a low-water mark (every range below it is
+    finished) plus the few ranges finished above it, so a checkpoint stays small however large the keyspaces are. It
+    is saved at most every <checkpoint_interval> seconds, as soon as a target is found, and when the search ends.
+    """
+    targets = {target.lower() for target in targets}
+    checkpoint = _load_checkpoint(checkpoint_path, keyspaces, range_size)
+    found: dict[str, str | None] = dict.fromkeys(checkpoint['found'])
+    low_water = checkpoint['low_water']
+    done_above = set(checkpoint['done_above'])
+    remaining_ranges = (search_range for search_range in split_ranges(keyspaces, range_size, low_water)
+                        if search_range[0] not in done_above)
+    target_states = frozenset(_hex_to_state(target) for target in targets - found.keys())
+
+    def save_checkpoint() -> None:
+        write_json_atomically(checkpoint_path, {'keyspaces': [keyspace.positions for keyspace in keyspaces],
+                                                'range_size': range_size, 'low_water': low_water,
+                                                'done_above': sorted(done_above), 'found': sorted(found)})
+
+    workers = workers or os.cpu_count() or 1
+    stop_event = multiprocessing.Event()
+    last_saved = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stop_event,)) as pool:
+        in_flight: dict[Future, int] = {}
+        while targets - found.keys():
+            # Keep two ranges per worker in flight
+            for number, keyspace_number, start, end in remaining_ranges:
+                future = pool.submit(_search_range, keyspaces[keyspace_number].positions, start, end, target_states)
+                in_flight[future] = number
+                if len(in_flight) >= 2 * workers:
+                    break
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            newly_found = False
+            for future in finished:
+                done_above.add(in_flight.pop(future))
+                results = future.result()
+                newly_found = newly_found or bool(results.keys() - found.keys())
+                found.update(results)
+            while low_water in done_above:
+                done_above.remove(low_water)
+                low_water += 1
+
+            if checkpoint_path is not None and (newly_found or time.monotonic() - last_saved >= checkpoint_interval):
+                save_checkpoint()
+                last_saved = time.monotonic()
+
+        stop_event.set()
+        for future in in_flight:
+            future.cancel()
+
+    if checkpoint_path is not None:
+        save_checkpoint()
+    return {target: candidate for target, candidate in found.items() if target in targets}
+
+
+def _init_worker(stop_event) -> None:
+    """
+    Stores the shared stop flag in a worker process.
+    """
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _search_range(positions: list[str], start: int, end: int, target_states: frozenset) -> dict[str, str]:
+    """
+    Hashes candidates number <start> to <end> - 1 of the keyspace with <positions> and returns a dict mapping the
+    hash of every candidate whose A, B, C, D vectors are in <target_states> to that candidate. Runs inside a worker
+    process and stops early once the shared stop flag is set.
+
+    Candidates that fit in one block are hashed through a CandidateBlock: the padding is built once per range and
+    only the bytes that change between consecutive candidates (usually just the last one) are patched into the
+    M-values.
+    """
+    if len(positions) > 55:
+        return _search_range_long(positions, start, end, target_states)
+
+    found = {}
+    codes = [[ord(character) for character in position] for position in positions]
+    radices = [len(position) for position in positions]
+    digits = Keyspace(positions).digits(start)
+
+    block = CandidateBlock(len(positions))
+    block.set_bytes(bytes(position[digit] for position, digit in zip(codes, digits)))
+    m_values = block.m_values
+    set_byte = block.set_byte
+    compress = hash_main.compress
+    initial_vectors = hash_main.INITIAL_VECTORS
+    last = len(digits) - 1
+
+    for count in range(end - start):
+        if count % _STOP_CHECK_INTERVAL == 0 and _stop_event is not None and _stop_event.is_set():
+            break
+        state = compress(initial_vectors, m_values)
+        if state in target_states:
+            found[hash_main._format_digest(state)] = ''.join(position[digit]
+                                                             for position, digit in zip(positions, digits))
+
+        # Move on to the next candidate, patching only the positions that change
+        i = last
+        while i >= 0:
+            digits[i] += 1
+            if digits[i] < radices[i]:
+                set_byte(i, codes[i][digits[i]])
+                break
+            digits[i] = 0
+            set_byte(i, codes[i][0])
+            i -= 1
+    return found
+
+
+def _search_range_long(positions: list[str], start: int, end: int, target_states: frozenset) -> dict[str, str]:
+    """
+    Same as _search_range, for candidates too long to fit in one block.
+    """
+    found = {}
+    for count, candidate in enumerate(_enumerate(positions, start, end)):
+        if count % _STOP_CHECK_INTERVAL == 0 and _stop_event is not None and _stop_event.is_set():
+            break
+        state = struct.unpack('<4I', MD5Hasher(candidate).digest())
+        if state in target_states:
+            found[hash_main._format_digest(state)] = candidate.decode('ascii')
+    return found
+
+
+def _enumerate(positions: list[str], start: int, end: int) -> Iterator[bytes]:
+    """
+    Yields candidates number <start> to <end> - 1 of the keyspace with <positions>, as bytes, by incrementing the
+    character index of the last position and carrying into the previous ones.
+    """
+    encoded_positions = [[character.encode('ascii') for character in position] for position in positions]
+    radices = [len(position) for position in positions]
+    digits = Keyspace(positions).digits(start)
+    for _ in range(start, end):
+        yield b''.join(position[digit] for position, digit in zip(encoded_positions, digits))
+        i = len(digits) - 1
+        while i >= 0:
+            digits[i] += 1
+            if digits[i] < radices[i]:
+                break
+            digits[i] = 0
+            i -= 1
+
+
+def _hex_to_state(hashed: str) -> tuple[int, int, int, int]:
+    """
+    Returns the A, B, C, D vectors encoded by a 32-character hexadecimal hash.
+
+    >>> hash_main._format_digest(_hex_to_state('900150983cd24fb0d6963f7d28e17f72'))
+    '900150983cd24fb0d6963f7d28e17f72'
+    """
+    return struct.unpack('<4I', bytes.fromhex(hashed))
+
+
+def _load_checkpoint(checkpoint_path: str | None, keyspaces: list[Keyspace], range_size: int) -> dict:
+    """
+    Returns the saved checkpoint for this search, or a fresh one if there is none.
+    """
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as file:
+            checkpoint = json.load(file)
+        if checkpoint['keyspaces'] != [keyspace.positions for keyspace in keyspaces] or \
+                checkpoint['range_size'] != range_size:
+            raise ValueError(f'{checkpoint_path} is a checkpoint for a different search')
+        if 'low_water' not in checkpoint:
+            raise ValueError(f'{checkpoint_path} is a checkpoint in an older format')
+        return checkpoint
+    return {'low_water': 0, 'done_above': [], 'found': []}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m keyspace_search',
+                                     description='Authorized strength testing of stored digests.')
+    parser.add_argument('targets', nargs='+', help='32-character hexadecimal hashes to search for')
+    parser.add_argument('--mask', help="candidate mask, e.g. '?u?l?l?l?d?d'")
+    parser.add_argument('--charset', default=string.ascii_lowercase + string.digits)
+    parser.add_argument('--min-length', type=int, default=1)
+    parser.add_argument('--max-length', type=int, default=6)
+    parser.add_argument('--range-size', type=int, default=DEFAULT_RANGE_SIZE)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--checkpoint', help='checkpoint file used to resume long searches')
+    parser.add_argument('--checkpoint-interval', type=float, default=DEFAULT_CHECKPOINT_INTERVAL,
+                        help='minimum seconds between two checkpoint saves')
+    args = parser.parse_args()
+
+    if args.mask:
+        search_keyspaces = [keyspace_from_mask(args.mask)]
+    else:
+        search_keyspaces = keyspaces_from_charset(args.charset, args.min_length, args.max_length)
+    results = search(args.targets, search_keyspaces, args.range_size, args.workers, args.checkpoint,
+                     args.checkpoint_interval)
+    for target in args.targets:
+        print(f"{target}  {results.get(target.lower(), '<not found>')}")
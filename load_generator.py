@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import time
+
+from login_service import DEFAULT_HOST, DEFAULT_PORT
+
+"""
+Load generator for login_service: every connection creates its own account, then sends VALIDATE requests (alternating
+correct and incorrect passwords) back to back, and the latency of every request is recorded.
+"""
+
+
+async def run_load(host: str, port: int, connections: int, requests_per_connection: int) -> dict[str, float]:
+    """
+    Drives the login service at <host>:<port> with <connections> concurrent connections, each sending
+    <requests_per_connection> VALIDATE requests, and returns a report with the request count, errors, elapsed seconds,
+    requests per second and the p50/p99 latencies in milliseconds.
+    """
+    latencies = []
+    errors = 0
+
+    async def run_connection(number: int) -> None:
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            username = f'load-{number}-{time.monotonic_ns()}'
+            password = f'password-{number}'
+            writer.write(f'CREATE {username} {password}\n'.encode('utf-8'))
+            await writer.drain()
+            await reader.readline()
+
+            for i in range(requests_per_connection):
+                attempt = password if i % 2 == 0 else password + '!'
+                start = time.perf_counter()
+                writer.write(f'VALIDATE {username} {attempt}\n'.encode('utf-8'))
+                await writer.drain()
+                response = await reader.readline()
+                latencies.append(time.perf_counter() - start)
+                if response != (b'OK true\n' if i % 2 == 0 else b'OK false\n'):
+                    errors += 1
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[run_connection(number) for number in range(connections)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {'requests': len(latencies),
+            'errors': errors,
+            'seconds': elapsed,
+            'requests_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+            'p50_ms': _percentile(latencies, 50) * 1000,
+            'p99_ms': _percentile(latencies, 99) * 1000}
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    """
+    Returns the <percent>th percentile (nearest rank) of <sorted_values>, or 0 if there are none.
+
+    >>> _percentile([1.0, 2.0, 3.0, 4.0], 50)
+    2.0
+    >>> _percentile([1.0, 2.0, 3.0, 4.0], 99)
+    4.0
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m load_generator', description='Load test login_service.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=100, help='requests per connection')
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args.host, args.port, args.connections, args.requests))
+    print(f"{report['requests']} requests ({report['errors']} errors) in {report['seconds']:.2f} s: "
+          f"{report['requests_per_second']:.0f} req/s, p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms")
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from async_login_system import DEFAULT_MAX_IN_FLIGHT, AsyncLoginSystem
+
+"""
+LINE PROTOCOL (one UTF-8 request per line, one response line per request, in order):
+
+    CREATE <username> <password>    ->  OK | ERR exists
+    VALIDATE <username> <password>  ->  OK true | OK false | ERR no-such-user
+    LOOKUP <username>               ->  OK <hash> | ERR no-such-user
+
+Usernames cannot contain spaces; the password is the rest of the line and may. Malformed requests get
+"ERR bad-request".
+"""
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+class LoginService:
+    """
+    A small asyncio TCP service exposing an AsyncLoginSystem over the line protocol above.
+    """
+
+    login_system: AsyncLoginSystem
+
+    def __init__(self, login_system: AsyncLoginSystem | None = None) -> None:
+        """
+        Creates a LoginService instance serving <login_system> (a new, empty one if None).
+        """
+        self.login_system = AsyncLoginSystem() if login_system is None else login_system
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.Server:
+        """
+        Starts listening on <host>:<port> (port 0 picks a free port) and returns the server.
+        """
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Answers every request line from one client until it disconnects.
+        """
+        try:
+            while line := await reader.readline():
+                response = await self.handle_request(line.decode('utf-8').rstrip('\r\n'))
+                writer.write(response.encode('utf-8') + b'\n')
+                await writer.drain()
+        except (ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request: str) -> str:
+        """
+        Returns the response line (without the newline) to one request line.
+
+        A request the login system cannot take (e.g. a non-ASCII password, which hash_main.hash cannot encode, or a
+        username too long for a DigestIndex) gets "ERR bad-request" instead of dropping the connection.
+        """
+        try:
+            return await self._dispatch(request)
+        except ValueError:
+            # Also covers UnicodeEncodeError, a subclass of ValueError
+            return 'ERR bad-request'
+
+    async def _dispatch(self, request: str) -> str:
+        """
+        Runs one request line and returns its response line.
+        """
+        command, _, arguments = request.partition(' ')
+        username, _, password = arguments.partition(' ')
+        system = self.login_system
+
+        if command == 'CREATE' and username and password:
+            return 'OK' if await system.create_account_if_new(username, password) else 'ERR exists'
+        elif command == 'VALIDATE' and username and password:
+            if not system.check_existing_username(username):
+                return 'ERR no-such-user'
+            return 'OK true' if await system.validate_password(username, password) else 'OK false'
+        elif command == 'LOOKUP' and username and not password:
+            if not system.check_existing_username(username):
+                return 'ERR no-such-user'
+            return 'OK ' + system.system.get_username_and_hash_pair(username)[1]
+        return 'ERR bad-request'
+
+
+async def serve(host: str, port: int, workers: int, max_in_flight: int) -> None:
+    """
+    Runs a LoginService until cancelled, hashing on a pool of <workers> processes (0 for the default thread pool).
+    """
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    try:
+        service = LoginService(AsyncLoginSystem(executor=executor, max_in_flight=max_in_flight))
+        server = await service.start(host, port)
+        print(f'Login service listening on {host}:{server.sockets[0].getsockname()[1]}')
+        async with server:
+            await server.serve_forever()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m login_service', description='Serve a LoginSystem over TCP.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=0, help='hashing processes (0: use a thread pool)')
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT, help='concurrent hash jobs')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_in_flight))
+    except KeyboardInterrupt:
+        pass
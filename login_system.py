@@ -1,4 +1,11 @@
+import hmac
+from typing import Iterable
+
 import hash_main
+import password_hashing
+from digest_index import DigestIndex
+from digest_store import CompactDigestStore
+from journal import JournaledDigestStore
 
 class LoginSystem:
     """
@@ -11,11 +18,41 @@ class LoginSystem:
 
     Although deterministic, the MD5 hashing algorithm is designed to be difficult to reverse-engineer due to the
     multi-layered algorithmic approach to breaking down a password into a 32-character hash.
+
+    If an index_path is given, the hash_map is a persistent, memory-mapped DigestIndex stored at that path instead of
+    an in-memory dict, so accounts survive restarts and are not loaded into memory on startup. Otherwise, if compact
+    is True, the hash_map is a CompactDigestStore that keeps the raw digests in one contiguous buffer. If a
+    journal_dir is given, the hash_map is a JournaledDigestStore: a CompactDigestStore persisted with an append-only
+    journal and snapshots in that directory.
+
+    If iterations is given, new passwords are stored salted and iterated with password_hashing (e.g. with
+    iterations=password_hashing.calibrate() for a 50 ms verify), in the in-memory dict or the JournaledDigestStore
+    only since the other stores hold bare 16-byte digests. Old unsalted hashes still verify and are upgraded on the
+    next successful login.
     """
-    hash_map: dict[str, str]
+    hash_map: dict[str, str] | DigestIndex | CompactDigestStore
+    iterations: int | None
+
+    def __init__(self, index_path: str | None = None, compact: bool = False, journal_dir: str | None = None,
+                 iterations: int | None = None) -> None:
+        if iterations is not None and (index_path is not None or (compact and journal_dir is None)):
+            raise ValueError('Salted passwords can only be stored in the in-memory dict or a journal_dir')
+        self.iterations = iterations
+        if index_path is not None:
+            self.hash_map = DigestIndex(index_path)
+        elif journal_dir is not None:
+            self.hash_map = JournaledDigestStore(journal_dir)
+        elif compact:
+            self.hash_map = CompactDigestStore()
+        else:
+            self.hash_map = {}
 
-    def __init__(self) -> None:
-        self.hash_map = {}
+    def close(self) -> None:
+        """
+        Saves any buffered accounts to the persistent index or journal, if the login system uses one.
+        """
+        if isinstance(self.hash_map, (DigestIndex, JournaledDigestStore)):
+            self.hash_map.close()
 
     def check_existing_username(self, username: str) -> bool:
         """
@@ -35,16 +72,46 @@ class LoginSystem:
 
         PRECONDITION: Username/password combination exists in the login system.
         """
+        if self.iterations is not None:
+            stored = self.hash_map[username]
+            if not password_hashing.verify_password(password, stored):
+                return False
+            if password_hashing.needs_rehash(stored, self.iterations):
+                self.hash_map[username] = password_hashing.hash_password(password, self.iterations)
+            return True
         hashed_password = hash_main.hash(password)
-        return self.hash_map[username] == hashed_password
+        return self.matches_hash(username, hashed_password)
+
+    def matches_hash(self, username: str, hashed_password: str) -> bool:
+        """
+        Returns true if <hashed_password> is the hash tied to the username in the system. The comparison takes the
+        same time wherever the hashes differ, and stores holding raw digests compare the 16 raw bytes.
+
+        PRECONDITION: Username exists in the login system.
+        """
+        if isinstance(self.hash_map, dict):
+            return hmac.compare_digest(self.hash_map[username], hashed_password)
+        digest = self.hash_map.get_digest(username)
+        if digest is None:
+            raise KeyError(username)
+        return hmac.compare_digest(digest, bytes.fromhex(hashed_password))
 
     def create_new_account(self, username: str, password: str) -> None:
         """
         Creates a new account with the appropriate password, but the original password itself is NOT saved.
         """
+        if self.iterations is not None:
+            self.hash_map[username] = password_hashing.hash_password(password, self.iterations)
+            return
         hashed_password = hash_main.hash(password)
         self.hash_map[username] = hashed_password
 
+    def add_hashed_accounts(self, accounts: Iterable[tuple[str, str]]) -> None:
+        """
+        Inserts already-hashed accounts, given as (username, hashed password) pairs, in a single pass.
+        """
+        self.hash_map.update(accounts)
+
     def get_username_and_hash_pair(self, username: str) -> tuple[str, str]:
         """
         Returns a tuple pair in the form (username, hashed password) upon being provided a username.
@@ -55,20 +122,23 @@ class LoginSystem:
         """
         Returns true if the database of the login system is empty, and false otherwise (if it is populated).
         """
-        return len(self.hash_map.keys()) == 0
+        return len(self.hash_map) == 0
 
     def print_database(self) -> None:
         """
         Print the login system database in a table-style format displaying all the stored username-hash pairs.
 
-        PRECONDITION: len(username) <= 32 and len(hash) == 32 for all username/hash pairs.
+        PRECONDITION: len(username) <= 32 for all usernames. Hashes are 32 characters long, except salted ones, which
+        widen the HASH column.
         """
-        print("-" * 71)
+        hash_width = max((len(self.hash_map[key]) for key in self.hash_map), default=32)
+        hash_width = max(hash_width, 32)
+        border = "-" * (39 + hash_width)
+        print(border)
         title_padding_username = 12 * " "
-        title_padding_hash = 14 * " "
-        print("| " + title_padding_username + "USERNAME" + title_padding_username + " | " + title_padding_hash + "HASH"
-              + title_padding_hash + " |")
-        print("-" * 71)
+        print("| " + title_padding_username + "USERNAME" + title_padding_username + " | " + "HASH".center(hash_width)
+              + " |")
+        print(border)
         for key in self.hash_map:
             if len(key) % 2 == 0:
                 left_padding = " " * ((32 - len(key)) // 2)
@@ -77,9 +147,10 @@ class LoginSystem:
                 left_padding = " " * ((32 - len(key)) // 2)
                 right_padding = left_padding + " "
 
-            iteration_str = "| " + left_padding + key + right_padding + " | " + self.hash_map[key] + " |"
+            iteration_str = "| " + left_padding + key + right_padding + " | " + self.hash_map[key].ljust(hash_width) \
+                + " |"
             print(iteration_str)
-        print("-" * 71)
+        print(border)
 
 if __name__ == '__main__':
     # Simulate a username/password login and display hash comparisons
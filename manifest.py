@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import stat
+import sys
+from typing import Iterator
+
+from batch_hashing import get_pool
+from file_hashing import hash_file
+from json_files import write_json_atomically
+
+"""
+Incremental directory manifests: the MD5 hash of every file under a directory, written md5sum-style as
+"<hash>  <relative path>" lines.
+
+A cache remembers the size, mtime and inode each file had when it was last hashed, so later runs only re-read the
+files whose metadata changed. Files are hashed in parallel on the shared process pool.
+"""
+
+# Runs with fewer files to hash than this hash them in the calling process, where pool overhead would dominate
+DEFAULT_SERIAL_THRESHOLD = 8
+
+
+def build_manifest(root: str | os.PathLike, cache_path: str | None = None,
+                   serial_threshold: int = DEFAULT_SERIAL_THRESHOLD) -> dict[str, str]:
+    """
+    Returns a dict mapping the relative path (with '/' separators) of every file under <root> to its hash.
+
+    If <cache_path> is given, a file whose (size, mtime, inode) matches its cache entry is not read again; the cache
+    is then rewritten with the current entry of every file.
+    """
+    root = os.fspath(root)
+    cache = _load_cache(cache_path)
+    manifest = {}
+    new_cache = {}
+    to_hash = []
+    for relative_path, file_stat in _walk(root):
+        key = [file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino]
+        entry = cache.get(relative_path)
+        if entry is not None and entry[:3] == key:
+            manifest[relative_path] = entry[3]
+            new_cache[relative_path] = entry
+        else:
+            to_hash.append((relative_path, key))
+
+    paths = [os.path.join(root, relative_path) for relative_path, _ in to_hash]
+    digests = map(hash_file, paths) if len(paths) < serial_threshold else get_pool().map(hash_file, paths)
+    for (relative_path, key), digest in zip(to_hash, digests):
+        manifest[relative_path] = digest
+        new_cache[relative_path] = key + [digest]
+
+    if cache_path is not None:
+        write_json_atomically(cache_path, new_cache)
+    return dict(sorted(manifest.items()))
+
+
+def verify_manifest(root: str | os.PathLike, manifest: dict[str, str], cache_path: str | None = None) -> \
+        dict[str, list[str]]:
+    """
+    Compares the files under <root> with <manifest> and returns a dict with the sorted relative paths of the files
+    that are 'mismatched' (different hash), 'missing' (in the manifest only) and 'added' (on disk only).
+
+    Without <cache_path> every file is read again, which also catches changes that leave the metadata untouched.
+    """
+    current = build_manifest(root, cache_path)
+    return {'mismatched': sorted(path for path in manifest.keys() & current.keys() if manifest[path] != current[path]),
+            'missing': sorted(manifest.keys() - current.keys()),
+            'added': sorted(current.keys() - manifest.keys())}
+
+
+def write_manifest(manifest: dict[str, str], path: str) -> None:
+    """
+    Atomically writes <manifest> to <path> as "<hash>  <relative path>" lines.
+    """
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        for relative_path, digest in manifest.items():
+            file.write(f'{digest}  {relative_path}\n')
+    os.replace(temporary_path, path)
+
+
+def read_manifest(path: str) -> dict[str, str]:
+    """
+    Returns the manifest written to <path> by write_manifest.
+    """
+    manifest = {}
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            digest, relative_path = line.rstrip('\n').split('  ', 1)
+            manifest[relative_path] = digest
+    return manifest
+
+
+def _walk(root: str) -> Iterator[tuple[str, os.stat_result]]:
+    """
+    Yields (relative path with '/' separators, stat) for every regular file under <root>. Symbolic links are not
+    followed.
+    """
+    for directory, directory_names, file_names in os.walk(root):
+        directory_names.sort()
+        for name in sorted(file_names):
+            path = os.path.join(directory, name)
+            file_stat = os.stat(path, follow_symlinks=False)
+            if stat.S_ISREG(file_stat.st_mode):
+                yield os.path.relpath(path, root).replace(os.sep, '/'), file_stat
+
+
+def _load_cache(cache_path: str | None) -> dict[str, list]:
+    """
+    Returns the cache saved at <cache_path>, mapping relative paths to [size, mtime_ns, inode, hash], or an empty one.
+    """
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    with open(cache_path) as file:
+        return json.load(file)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Command-line entry point: writes the manifest of a directory, or verifies a directory against one.
+
+    Returns the exit status (1 if verification found any difference, 0 otherwise).
+    """
+    parser = argparse.ArgumentParser(prog='python -m manifest', description='Hash directory trees with MD5.')
+    parser.add_argument('root', help='directory to hash')
+    parser.add_argument('manifest', help='manifest file to write, or to verify against with --verify')
+    parser.add_argument('--verify', action='store_true', help='report files that differ from the manifest')
+    parser.add_argument('--cache', help='cache file used to skip files whose size, mtime and inode are unchanged')
+    args = parser.parse_args(argv)
+
+    if not args.verify:
+        write_manifest(build_manifest(args.root, args.cache), args.manifest)
+        return 0
+
+    differences = verify_manifest(args.root, read_manifest(args.manifest), args.cache)
+    for kind, paths in differences.items():
+        for path in paths:
+            print(f'{kind.upper()}: {path}')
+    return 1 if any(differences.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+
+import utils
+from hasher import MD5Hasher
+
+# Number of prefixes kept by the default cache
+DEFAULT_MAX_PREFIXES = 256
+
+
+class MidstateCache:
+    """
+    A bounded least-recently-used cache of MD5 midstates for shared prefixes (e.g. per-tenant salts or fixed headers).
+
+    The midstate of a prefix is an MD5Hasher that has consumed the prefix: its A, B, C, D vectors after the prefix's
+    full blocks, plus the prefix's last partial block. Hashing prefix + suffix then only compresses the blocks that
+    contain the suffix.
+
+    >>> cache = MidstateCache()
+    >>> cache.hash_with_prefix('They are ', 'deterministic')
+    '23db6982caef9e9152f1a5b2589e6ca3'
+
+    === REPRESENTATION INVARIANTS ===
+    len(midstates) <= max_prefixes
+    """
+
+    max_prefixes: int
+    midstates: OrderedDict[bytes, MD5Hasher]
+    hits: int
+    misses: int
+
+    def __init__(self, max_prefixes: int = DEFAULT_MAX_PREFIXES) -> None:
+        """
+        Creates a MidstateCache instance holding at most <max_prefixes> midstates.
+        """
+        self.max_prefixes = max_prefixes
+        self.midstates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_midstate(self, prefix: str | bytes) -> MD5Hasher:
+        """
+        Returns a new MD5Hasher that has already consumed <prefix>, computing and caching the prefix's midstate if it
+        is not cached yet. The returned hasher can be updated freely without affecting the cache.
+        """
+        key = utils.get_bytes(prefix) if isinstance(prefix, str) else bytes(prefix)
+
+        midstate = self.midstates.get(key)
+        if midstate is None:
+            self.misses += 1
+            midstate = MD5Hasher(key)
+            self.midstates[key] = midstate
+            if len(self.midstates) > self.max_prefixes:
+                self.midstates.popitem(last=False)
+        else:
+            self.hits += 1
+            self.midstates.move_to_end(key)
+
+        return midstate.copy()
+
+    def hash_with_prefix(self, prefix: str | bytes, suffix: str | bytes) -> str:
+        """
+        Returns the MD5 hash of <prefix> followed by <suffix>, resuming from the cached midstate of <prefix>.
+        """
+        hasher = self.get_midstate(prefix)
+        hasher.update(suffix)
+        return hasher.hexdigest()
+
+    def clear(self) -> None:
+        """
+        Removes every cached midstate and resets the hit and miss counts.
+        """
+        self.midstates.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+_default_cache = MidstateCache()
+
+
+def hash_with_prefix(prefix: str | bytes, suffix: str | bytes) -> str:
+    """
+    Returns the MD5 hash of <prefix> followed by <suffix> using the module's shared MidstateCache.
+
+    >>> hash_with_prefix('a' * 100, 'b') == hash_with_prefix('a' * 100 + 'b', '')
+    True
+    """
+    return _default_cache.hash_with_prefix(prefix, suffix)
@@ -0,0 +1,89 @@
+from typing import Sequence
+
+import hash_main
+import utils
+from hasher import get_padding
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Per-operation schedules for all 64 operations (4 rounds of 16), built from the round tables in hash_main
+_M_INDICES = (hash_main.ROUND_ONE_M_INDICES + hash_main.ROUND_TWO_M_INDICES + hash_main.ROUND_THREE_M_INDICES
+              + hash_main.ROUND_FOUR_M_INDICES)
+_SHIFTS = tuple(shifts[i & 3] for shifts in (hash_main.ROUND_ONE_SHIFTS, hash_main.ROUND_TWO_SHIFTS,
+                                             hash_main.ROUND_THREE_SHIFTS, hash_main.ROUND_FOUR_SHIFTS)
+                for i in range(16))
+
+
+def hash_lanes(messages: Sequence[str | bytes]) -> list[str]:
+    """
+    Returns the MD5 hash of every message in <messages>, in order, hashing many messages at once.
+
+    Messages with the same number of 512-bit blocks are grouped together, and each group runs as one lane per
+    message: the M-values of the group are packed into an (N, 16) matrix of 32-bit words per block and all 64
+    operations are applied to every lane at once with NumPy array operations.
+
+    Requires NumPy. Strings are converted to bytes using ASCII reference, the same way hash_main.hash does.
+
+    >>> hash_lanes(['a', 'They are deterministic'])
+    ['0cc175b9c0f1b6a831c399e269772661', '23db6982caef9e9152f1a5b2589e6ca3']
+    """
+    if np is None:
+        raise ImportError('hash_lanes requires NumPy (pip install numpy)')
+
+    encoded = [utils.get_bytes(message) if isinstance(message, str) else bytes(message) for message in messages]
+
+    # Group the message positions by the number of blocks each padded message takes up
+    groups: dict[int, list[int]] = {}
+    for position, message in enumerate(encoded):
+        groups.setdefault(len(message) // 64 + (1 if len(message) % 64 < 56 else 2), []).append(position)
+
+    hashes = [''] * len(encoded)
+    for block_count, positions in groups.items():
+        padded = np.zeros((len(positions), block_count * 64), dtype=np.uint8)
+        for row, position in enumerate(positions):
+            message = encoded[position]
+            padded[row] = np.frombuffer(message + get_padding(len(message)), dtype=np.uint8)
+
+        # (N, block_count, 16) little-endian M-values
+        words = padded.view('<u4').reshape(len(positions), block_count, 16)
+        digests = _hash_group(words).tobytes()
+        for row, position in enumerate(positions):
+            hashes[position] = digests[row * 16:(row + 1) * 16].hex()
+
+    return hashes
+
+
+def _hash_group(words: 'np.ndarray') -> 'np.ndarray':
+    """
+    Runs every block of a group of equally long messages through the compression function, one lane per message,
+    and returns the final A, B, C, D vectors as an (N, 4) little-endian uint32 matrix.
+    """
+    lanes = words.shape[0]
+    # Lanes are computed in 64-bit integers so that every modular addition is wrapped explicitly with WORD_MASK
+    state = [np.full(lanes, vector, dtype=np.uint64) for vector in hash_main.INITIAL_VECTORS]
+    mask = np.uint64(hash_main.WORD_MASK)
+
+    for block in range(words.shape[1]):
+        m_values = [column.astype(np.uint64) for column in words[:, block, :].T]
+        a, b, c, d = state
+        for i in range(64):
+            if i < 16:
+                func_output = (b & c) | (~b & d)
+            elif i < 32:
+                func_output = (b & d) | (c & ~d)
+            elif i < 48:
+                func_output = b ^ c ^ d
+            else:
+                func_output = c ^ (b | (~d & mask))
+            total = (a + (func_output & mask) + m_values[_M_INDICES[i]] + np.uint64(hash_main.K_VALUES[i])) & mask
+            shift = _SHIFTS[i]
+            rotated = ((total << np.uint64(shift)) | (total >> np.uint64(32 - shift))) & mask
+            a, b, c, d = d, (b + rotated) & mask, b, c
+
+        # RUN WRAP-UP OPERATIONS
+        state = [(new + old) & mask for new, old in zip((a, b, c, d), state)]
+
+    return np.stack(state, axis=1).astype('<u4')
@@ -0,0 +1,126 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from typing import BinaryIO, Callable, Iterator
+
+import batch_hashing
+from json_files import write_json_atomically
+from login_system import LoginSystem
+
+# Number of wordlist entries hashed between two checkpoints
+DEFAULT_BATCH_SIZE = 100000
+
+
+def build_digest_lookup(system: LoginSystem) -> dict[str, list[str]]:
+    """
+    Returns a dict mapping every hash stored in <system> to the usernames whose password has that hash, so that a
+    candidate's hash can be matched against every account with one O(1) lookup.
+
+    Salted passwords cannot be matched this way (each one would need its own PBKDF2 run per candidate), so a
+    LoginSystem storing them is rejected with a ValueError.
+    """
+    if system.iterations is not None:
+        raise ValueError('Salted passwords cannot be audited against a wordlist')
+    lookup = {}
+    for username in system.hash_map:
+        lookup.setdefault(system.hash_map[username], []).append(username)
+    return lookup
+
+
+def audit_wordlist(system: LoginSystem, wordlist_path: str, checkpoint_path: str | None = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE, progress: Callable[[int, float], None] | None = None,
+                   reveal_passwords: bool = False) -> set[str] | dict[str, str | None]:
+    """
+    Returns the set of usernames of every account in <system> whose password appears in the wordlist at
+    <wordlist_path> (one password per line).
+
+    Recovered passwords are NEVER written to disk. Only if <reveal_passwords> is true, a dict mapping every flagged
+    username to its password is returned instead (None for accounts flagged before resuming from a checkpoint).
+
+    The wordlist is streamed from disk batch_size entries at a time and each batch is hashed in parallel with
+    batch_hashing.hash_many, so the wordlist is never held in memory. Entries that are not ASCII are skipped, since
+    hash_main.hash cannot have stored them.
+
+    If <checkpoint_path> is given, the position in the wordlist and the usernames flagged so far are saved there
+    (readable by the owner only) after every batch, and an audit of the same wordlist resumes from an existing
+    checkpoint. If given, progress(entries checked so far, elapsed seconds) is called after every batch.
+    """
+    lookup = build_digest_lookup(system)
+    checkpoint = _load_checkpoint(checkpoint_path, wordlist_path)
+    found = dict.fromkeys(checkpoint['flagged'])
+    checked = checkpoint['checked']
+    start = time.perf_counter()
+
+    with open(wordlist_path, 'rb') as file:
+        file.seek(checkpoint['offset'])
+        for batch, end_offset in _read_batches(file, batch_size):
+            for candidate, hashed_candidate in zip(batch, batch_hashing.hash_many(batch)):
+                for username in lookup.get(hashed_candidate, ()):
+                    found[username] = candidate
+            checked += len(batch)
+
+            if checkpoint_path is not None:
+                write_json_atomically(checkpoint_path, {'wordlist': os.path.abspath(wordlist_path),
+                                                        'offset': end_offset, 'checked': checked,
+                                                        'flagged': sorted(found)})
+            if progress is not None:
+                progress(checked, time.perf_counter() - start)
+
+    return found if reveal_passwords else set(found)
+
+
+def _read_batches(file: BinaryIO, batch_size: int) -> Iterator[tuple[list[str], int]]:
+    """
+    Yields (batch of up to <batch_size> wordlist entries, file offset just after the batch) pairs, reading <file>
+    from its current position.
+    """
+    offset = file.tell()
+    while True:
+        lines = list(itertools.islice(file, batch_size))
+        if not lines:
+            return
+        batch = []
+        for line in lines:
+            offset += len(line)
+            try:
+                batch.append(line.rstrip(b'\r\n').decode('ascii'))
+            except UnicodeDecodeError:
+                continue
+        yield batch, offset
+
+
+def _load_checkpoint(checkpoint_path: str | None, wordlist_path: str) -> dict:
+    """
+    Returns the saved checkpoint for <wordlist_path>, or a fresh one if there is none.
+    """
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as file:
+            checkpoint = json.load(file)
+        if checkpoint['wordlist'] != os.path.abspath(wordlist_path):
+            raise ValueError(f'{checkpoint_path} is a checkpoint for another wordlist ({checkpoint["wordlist"]})')
+        return checkpoint
+    return {'wordlist': os.path.abspath(wordlist_path), 'offset': 0, 'checked': 0, 'flagged': []}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m password_audit',
+                                     description='Flag accounts whose password appears in a wordlist.')
+    parser.add_argument('wordlist', help='file of candidate passwords, one per line')
+    parser.add_argument('index', help='digest index file of the LoginSystem to audit')
+    parser.add_argument('--checkpoint', help='checkpoint file used to resume long audits')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    def print_progress(checked: int, elapsed: float) -> None:
+        print(f'{checked} candidates checked ({checked / max(elapsed, 1e-9):.0f}/s)', file=sys.stderr)
+
+    audited_system = LoginSystem(index_path=args.index)
+    try:
+        flagged = audit_wordlist(audited_system, args.wordlist, args.checkpoint, args.batch_size, print_progress)
+    finally:
+        audited_system.close()
+    for flagged_username in sorted(flagged):
+        print(flagged_username)
@@ -0,0 +1,117 @@
+import hmac
+import os
+import struct
+import time
+
+import hash_main
+from hasher import get_padding
+from hmac_md5 import BLOCK_SIZE, HMACKey
+
+"""
+Salted, iterated password hashing for LoginSystem, with a work factor that is an explicit, tunable budget.
+
+Passwords are stored as PBKDF2-HMAC-MD5 (RFC 8018, one 16-byte block) in a self-describing format:
+
+    pbkdf2-md5$<iterations>$<salt as hexadecimal>$<derived key as hexadecimal>
+
+so every entry records its own algorithm tag, iteration count and salt, and entries with different budgets can live
+side by side. Plain 32-character hexadecimal hashes from before this scheme still verify.
+"""
+
+ALGORITHM = 'pbkdf2-md5'
+
+# Bytes of random salt per password
+SALT_SIZE = 16
+
+# Used when no iteration count is given; calibrate() picks one for a latency budget on the current host
+DEFAULT_ITERATIONS = 1000
+
+# Per-verify latency budget used by calibrate()
+DEFAULT_TARGET_SECONDS = 0.05
+
+# Every HMAC after the first covers a single 16-byte block, so both of its compressions use this fixed padding
+_PADDING_WORDS = struct.unpack('<12I', get_padding(BLOCK_SIZE + 16))
+
+
+def hash_password(password: str | bytes, iterations: int = DEFAULT_ITERATIONS, salt: bytes | None = None) -> str:
+    """
+    Returns the stored form of <password> with <iterations> iterations and <salt> (SALT_SIZE random bytes if None).
+
+    >>> hash_password('abc', 2, bytes(4))
+    'pbkdf2-md5$2$00000000$bd1c758580338ce693af9d41221f67f2'
+    """
+    if iterations < 1:
+        raise ValueError('The iteration count must be at least 1')
+    salt = os.urandom(SALT_SIZE) if salt is None else salt
+    derived_key = _pbkdf2(password, salt, iterations)
+    return f'{ALGORITHM}${iterations}${salt.hex()}${derived_key.hex()}'
+
+
+def verify_password(password: str | bytes, stored: str) -> bool:
+    """
+    Returns true if <password> matches <stored>, which is either the stored form written by hash_password or an old
+    unsalted hash_main.hash of the password. The final comparison takes the same time wherever the hashes differ.
+    """
+    if '$' not in stored:
+        return hmac.compare_digest(hash_main.hash(password), stored.lower())
+    iterations, salt, derived_key = _parse(stored)
+    return hmac.compare_digest(_pbkdf2(password, salt, iterations), derived_key)
+
+
+def needs_rehash(stored: str, iterations: int = DEFAULT_ITERATIONS) -> bool:
+    """
+    Returns true if <stored> is an old unsalted hash or was stored with an iteration count other than <iterations>.
+    """
+    return '$' not in stored or _parse(stored)[0] != iterations
+
+
+def calibrate(target_seconds: float = DEFAULT_TARGET_SECONDS, minimum_probe_seconds: float = 0.01) -> int:
+    """
+    Benchmarks the current hashing engine on this host and returns the iteration count for which one verify takes
+    about <target_seconds>.
+
+    The probe doubles its iteration count until a run takes at least <minimum_probe_seconds>, then scales linearly.
+    """
+    salt = bytes(SALT_SIZE)
+    probe = 64
+    while True:
+        start = time.perf_counter()
+        _pbkdf2('calibration', salt, probe)
+        elapsed = time.perf_counter() - start
+        if elapsed >= minimum_probe_seconds:
+            return max(1, round(probe * target_seconds / elapsed))
+        probe *= 2
+
+
+def _parse(stored: str) -> tuple[int, bytes, bytes]:
+    """
+    Returns (iterations, salt, derived key) from the stored form written by hash_password.
+    """
+    fields = stored.split('$')
+    if len(fields) != 4 or fields[0] != ALGORITHM:
+        raise ValueError(f'Unsupported stored password format {stored.split("$", 1)[0]!r}')
+    return int(fields[1]), bytes.fromhex(fields[2]), bytes.fromhex(fields[3])
+
+
+def _pbkdf2(password: str | bytes, salt: bytes, iterations: int) -> bytes:
+    """
+    Returns the 16-byte PBKDF2-HMAC-MD5 of <password> and <salt>.
+
+    The HMAC key states are computed once. Every iteration after the first is then exactly two compressions, with the
+    previous result fed in as four words and never converted to bytes.
+    """
+    key = HMACKey(password)
+    inner_state = key.inner.state
+    outer_state = key.outer.state
+    padding = _PADDING_WORDS
+    compress = hash_main.compress
+
+    block = struct.unpack('<4I', key.digest(salt + b'\x00\x00\x00\x01'))
+    a, b, c, d = block
+    for _ in range(iterations - 1):
+        block = compress(outer_state, compress(inner_state, block + padding) + padding)
+        a ^= block[0]
+        b ^= block[1]
+        c ^= block[2]
+        d ^= block[3]
+    return struct.pack('<4I', a, b, c, d)
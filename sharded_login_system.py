@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+import threading
+import zlib
+from multiprocessing.connection import Connection
+from typing import Iterable
+
+from login_system import LoginSystem
+
+
+class ShardedLoginSystem:
+    """
+    A LoginSystem split into shards, each owned by its own worker process with its own interpreter and GIL.
+
+    Every username belongs to exactly one shard, chosen with a stable hash of the username (CRC-32, so the same
+    username always lands on the same shard, in every run). Each shard's worker holds that shard's hash_map and does
+    its own hashing. Single calls are forwarded to one shard (calls from different threads to different shards run in
+    parallel), and batch calls are scattered to every shard at once and gathered back in input order. If iterations is
+    given, every shard stores salted passwords like LoginSystem(iterations=iterations).
+
+    === REPRESENTATION INVARIANTS ===
+    len(connections) == len(processes) == len(locks) == shard_count
+    """
+
+    shard_count: int
+    iterations: int | None
+    processes: list[multiprocessing.Process]
+    connections: list[Connection]
+    locks: list[threading.Lock]
+
+    def __init__(self, shard_count: int | None = None, iterations: int | None = None) -> None:
+        """
+        Creates a ShardedLoginSystem instance with <shard_count> shards (one per core if None) and starts their
+        workers.
+        """
+        self.shard_count = shard_count or os.cpu_count() or 1
+        self.iterations = iterations
+        self.processes = []
+        self.connections = []
+        self.locks = []
+        for _ in range(self.shard_count):
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_shard_worker, args=(child_connection, iterations),
+                                              daemon=True)
+            process.start()
+            child_connection.close()
+            self.processes.append(process)
+            self.connections.append(parent_connection)
+            self.locks.append(threading.Lock())
+
+    def shard_for(self, username: str) -> int:
+        """
+        Returns the number of the shard that owns <username>.
+        """
+        return zlib.crc32(username.encode('utf-8')) % self.shard_count
+
+    def _call(self, shard: int, operation: str, arguments: list) -> list:
+        """
+        Runs <operation> on every item of <arguments> in the worker of <shard> and returns the results.
+        """
+        with self.locks[shard]:
+            self.connections[shard].send((operation, arguments))
+            return _unwrap(self.connections[shard].recv())
+
+    def _scatter_gather(self, operation: str, arguments: list[tuple]) -> list:
+        """
+        Runs <operation> on every item of <arguments> (each starting with a username) in the worker of the shard that
+        owns it, with every shard working at the same time, and returns the results in input order.
+        """
+        positions_by_shard: dict[int, list[int]] = {}
+        for position, item in enumerate(arguments):
+            positions_by_shard.setdefault(self.shard_for(item[0]), []).append(position)
+
+        shards = sorted(positions_by_shard)
+        for shard in shards:
+            self.locks[shard].acquire()
+        try:
+            for shard in shards:
+                self.connections[shard].send((operation, [arguments[i] for i in positions_by_shard[shard]]))
+            responses = {shard: self.connections[shard].recv() for shard in shards}
+        finally:
+            for shard in shards:
+                self.locks[shard].release()
+
+        results = [None] * len(arguments)
+        for shard in shards:
+            for position, result in zip(positions_by_shard[shard], _unwrap(responses[shard])):
+                results[position] = result
+        return results
+
+    def check_existing_username(self, username: str) -> bool:
+        """
+        Checks if the username already exists in the login system.
+        """
+        return self._call(self.shard_for(username), 'check_existing_username', [(username,)])[0]
+
+    def validate_password(self, username: str, password: str) -> bool:
+        """
+        Sharded LoginSystem.validate_password.
+
+        PRECONDITION: Username/password combination exists in the login system.
+        """
+        return self._call(self.shard_for(username), 'validate_password', [(username, password)])[0]
+
+    def create_new_account(self, username: str, password: str) -> None:
+        """
+        Sharded LoginSystem.create_new_account.
+        """
+        self._call(self.shard_for(username), 'create_new_account', [(username, password)])
+
+    def get_username_and_hash_pair(self, username: str) -> tuple[str, str]:
+        """
+        Returns a tuple pair in the form (username, hashed password) upon being provided a username.
+        """
+        return self._call(self.shard_for(username), 'get_username_and_hash_pair', [(username,)])[0]
+
+    def validate_many(self, accounts: Iterable[tuple[str, str]]) -> list[bool]:
+        """
+        Validates every (username, password) pair in <accounts> across all shards at once and returns the results in
+        order.
+
+        PRECONDITION: Every username exists in the login system.
+        """
+        return self._scatter_gather('validate_password', list(accounts))
+
+    def create_many(self, accounts: Iterable[tuple[str, str]]) -> None:
+        """
+        Creates an account for every (username, password) pair in <accounts> across all shards at once.
+        """
+        self._scatter_gather('create_new_account', list(accounts))
+
+    def __len__(self) -> int:
+        """
+        Returns the number of accounts across every shard.
+        """
+        return sum(self._call(shard, 'count', [()])[0] for shard in range(self.shard_count))
+
+    def close(self) -> None:
+        """
+        Stops every shard worker. Their accounts are discarded.
+        """
+        for connection, process in zip(self.connections, self.processes):
+            if process.is_alive():
+                connection.send(None)
+                process.join()
+            connection.close()
+        self.processes = []
+        self.connections = []
+
+    def __enter__(self) -> 'ShardedLoginSystem':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _unwrap(response: tuple[bool, object]) -> object:
+    """
+    Returns the results in a worker's response, or raises the exception the worker sent back.
+    """
+    succeeded, value = response
+    if not succeeded:
+        raise value
+    return value
+
+
+def _shard_worker(connection: Connection, iterations: int | None = None) -> None:
+    """
+    Owns one shard's LoginSystem (salted if <iterations> is given): runs every (operation, list of arguments) request
+    received on <connection> and sends back (True, list of results), or (False, exception) if any item failed. Stops
+    on None.
+    """
+    system = LoginSystem(iterations=iterations)
+    operations = {'check_existing_username': system.check_existing_username,
+                  'validate_password': system.validate_password,
+                  'create_new_account': system.create_new_account,
+                  'get_username_and_hash_pair': system.get_username_and_hash_pair,
+                  'count': lambda: len(system.hash_map)}
+    while (request := connection.recv()) is not None:
+        operation, arguments = request
+        try:
+            connection.send((True, [operations[operation](*item) for item in arguments]))
+        except Exception as error:
+            connection.send((False, error))
+    connection.close()
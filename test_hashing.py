@@ -1,7 +1,40 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
+import account_import
+import batch_hashing
+import benchmarks
+from async_login_system import AsyncLoginSystem
+import file_hashing
 import hash_main
+import instrumentation
+import journal
+import json_files
+import keyspace_search
+import load_generator
+import manifest
+import numpy_hashing
+import password_audit
+import password_hashing
+import utils
+from block import CandidateBlock
+from blockcollection import BlockCollection
+from digest_index import DigestIndex
+from digest_store import CompactDigestStore
+from hasher import MD5Hasher
+from hmac_md5 import HMACKey, hmac_md5
+from midstate_cache import MidstateCache
+from login_service import LoginService
 from login_system import LoginSystem
+from sharded_login_system import ShardedLoginSystem
+from tree_hashing import tree_hash, tree_hash_file
 
 
 def test_login_system():
@@ -25,7 +58,7 @@ def test_login_system():
     assert system.validate_password("guest2", password)
 
     hashed_input_password = hash_main.hash(password)
-    hashed_other_password = hash_main.hash("ab")
+    hashed_other_password = hash_main.hash("a")
     hashed_true_password = system.get_username_and_hash_pair("guest2")[1]
 
     assert hashed_input_password == hashed_true_password
@@ -157,4 +190,794 @@ def test_correct_user():
     assert system.validate_password("guest2", "a")
 
 
+def test_standard_md5_digests():
+    """
+    Test that hashes match the standard MD5 digests (RFC 1321) on either side of every padding boundary.
+    """
+    for length in [0, 1, 3, 55, 56, 57, 63, 64, 65, 119, 120, 128, 195, 1000]:
+        case = ''.join(chr(ord('a') + (i * 7) % 26) for i in range(length))
+        assert hash_main.hash(case) == hashlib.md5(case.encode('ascii')).hexdigest()
+
+    assert hash_main.hash('abc') == '900150983cd24fb0d6963f7d28e17f72'
+    assert hash_main.hash('message digest') == 'f96b697d7cb7938d525a2f31aaf161d0'
+
+
+def test_compress_integer_words():
+    """
+    Test that the compression engine keeps the A, B, C, D vectors as 32-bit integers.
+    """
+    state = hash_main.compress(hash_main.INITIAL_VECTORS, [0x80] + [0] * 15)
+
+    assert all(isinstance(vector, int) and 0 <= vector <= hash_main.WORD_MASK for vector in state)
+    assert hash_main._format_digest(state) == 'd41d8cd98f00b204e9800998ecf8427e'
+
+
+def test_incremental_hasher():
+    """
+    Test that feeding the MD5Hasher in uneven pieces gives the same digest as hashing the whole message at once, and
+    that copies are independent of the original.
+    """
+    message = bytes(range(256)) * 5
+
+    for piece_size in [1, 7, 63, 64, 65, 200]:
+        hasher = MD5Hasher()
+        for i in range(0, len(message), piece_size):
+            hasher.update(message[i:i + piece_size])
+        assert len(hasher.buffer) < 64
+        assert hasher.digest() == hashlib.md5(message).digest()
+
+    hasher = MD5Hasher('They are ')
+    other = hasher.copy()
+    hasher.update('deterministic')
+    assert hasher.hexdigest() == hash_main.hash('They are deterministic')
+    assert other.hexdigest() == hash_main.hash('They are ')
+
+    # Requesting a digest does not finalize the hasher
+    other.update('deterministic')
+    assert other.hexdigest() == hasher.hexdigest()
+
+
+def test_compact_blocks_match_bit_blocks():
+    """
+    Test that a compact (byte-backed) BlockCollection produces the same blocks and M-values as one built from a bit
+    string, on either side of every padding boundary.
+    """
+    for length in [0, 1, 55, 56, 57, 63, 64, 65, 120, 128]:
+        case = 'x' * length
+        bit_string = utils.get_bits_as_string(case)
+        bit_blocks = BlockCollection(bit_string, utils.get_number_of_bits_from_bit_string(bit_string)).collection
+        compact_blocks = BlockCollection(utils.get_bytes(case)).collection
+
+        assert len(bit_blocks) == len(compact_blocks)
+        for bit_block, compact_block in zip(bit_blocks, compact_blocks):
+            assert not bit_block.is_compact() and compact_block.is_compact()
+            assert type(bit_block) == type(compact_block)
+            assert bit_block.get_m_values() == compact_block.get_m_values()
+            assert str(bit_block) == str(compact_block)
+
+
+def test_large_input_blocks():
+    """
+    Test that inputs spanning thousands of blocks are hashed correctly, and that a lazy BlockCollection generates the
+    same blocks as an eager one.
+    """
+    case = 'abcdefghij' * 20000
+    assert hash_main.hash(case) == hashlib.md5(case.encode('ascii')).hexdigest()
+
+    data = utils.get_bytes(case)
+    lazy_collection = BlockCollection(data, lazy=True)
+    assert lazy_collection.collection is None
+    eager_blocks = BlockCollection(data).collection
+    assert len(eager_blocks) == len(data) // 64 + 1
+    assert [block.get_m_values() for block in lazy_collection] == [block.get_m_values() for block in eager_blocks]
+
+
+def test_hash_file(tmp_path, capsys):
+    """
+    Test that files are hashed correctly through both the memory-mapped and the chunked read paths, including an
+    empty file and the command-line entry point.
+    """
+    data = bytes(range(256)) * 1000 + b'tail'
+    path = tmp_path / 'artifact.bin'
+    path.write_bytes(data)
+    empty_path = tmp_path / 'empty.bin'
+    empty_path.write_bytes(b'')
+
+    expected = hashlib.md5(data).hexdigest()
+    assert file_hashing.hash_file(path) == expected
+    assert file_hashing.hash_file(path, use_mmap=False, chunk_size=1000) == expected
+    assert file_hashing.hash_file(empty_path) == hash_main.hash('')
+
+    digest, size, elapsed = file_hashing.hash_file_timed(path)
+    assert digest == expected and size == len(data) and elapsed >= 0
+
+    assert file_hashing.main([str(path), '--no-mmap']) == 0
+    assert capsys.readouterr().out == f'{expected}  {path}\n'
+    assert file_hashing.main([str(tmp_path / 'missing.bin')]) == 1
+
+    # A chunk size that reads nothing would silently report the hash of an empty file
+    for chunk_size in [0, -1]:
+        with pytest.raises(ValueError):
+            file_hashing.hash_file(path, use_mmap=False, chunk_size=chunk_size)
+    with pytest.raises(SystemExit):
+        file_hashing.main([str(path), '--chunk-size', '0'])
+
+
+def test_hash_many():
+    """
+    Test that batch hashing preserves the input order, both for small batches hashed serially and for batches
+    dispatched to the process pool.
+    """
+    messages = [f'password{i}' for i in range(300)]
+    expected = [hash_main.hash(message) for message in messages]
+
+    assert list(batch_hashing.hash_many(messages)) == expected
+    assert list(batch_hashing.hash_many(iter(messages), chunk_size=7, serial_threshold=10)) == expected
+    assert list(batch_hashing.hash_many([])) == []
+    with pytest.raises(ValueError):
+        batch_hashing.hash_many(messages, chunk_size=0, serial_threshold=10)
+
+    batch_hashing.shutdown_pool()
+
+
+def test_hash_lanes():
+    """
+    Test that the NumPy lane-parallel backend matches hash_main.hash for a batch of messages with mixed block counts.
+    """
+    pytest.importorskip('numpy')
+
+    messages = ['x' * length for length in [0, 1, 55, 56, 63, 64, 119, 120, 200]] + ['abc', 'They are deterministic']
+    assert numpy_hashing.hash_lanes(messages) == [hash_main.hash(message) for message in messages]
+    assert numpy_hashing.hash_lanes([b'abc']) == ['900150983cd24fb0d6963f7d28e17f72']
+    assert numpy_hashing.hash_lanes([]) == []
+
+
+def test_unrolled_compressor():
+    """
+    Test that the generated straight-line compression function matches the reference one, and that either can be
+    selected for hash.
+    """
+    state = hash_main.INITIAL_VECTORS
+    for seed in range(20):
+        m_values = [(seed * 0x9E3779B9 + i * 0x7F4A7C15) & hash_main.WORD_MASK for i in range(16)]
+        assert hash_main.compress_unrolled(state, m_values) == hash_main.compress_reference(state, m_values)
+        state = hash_main.compress_reference(state, m_values)
+
+    try:
+        hash_main.set_compressor('reference')
+        assert hash_main.compress is hash_main.compress_reference
+        assert hash_main.hash('They are deterministic') == '23db6982caef9e9152f1a5b2589e6ca3'
+    finally:
+        hash_main.set_compressor('unrolled')
+    assert hash_main.compress is hash_main.compress_unrolled
+
+    with pytest.raises(ValueError):
+        hash_main.set_compressor('missing')
+
+
+def test_midstate_cache():
+    """
+    Test that hashing from a cached prefix midstate matches hashing the full message, and that the cache stays within
+    its bound by evicting the least recently used prefix.
+    """
+    cache = MidstateCache(max_prefixes=2)
+    salt = 'tenant-salt-' * 10
+
+    for suffix in ['', 'a', 'password', 'x' * 70]:
+        assert cache.hash_with_prefix(salt, suffix) == hash_main.hash(salt + suffix)
+    assert cache.misses == 1 and cache.hits == 3
+
+    cache.hash_with_prefix('header-one', 'body')
+    cache.hash_with_prefix(salt, 'body')
+    cache.hash_with_prefix('header-two', 'body')
+    assert list(cache.midstates) == [salt.encode('ascii'), b'header-two']
+
+
+def test_digest_index(tmp_path):
+    """
+    Test that a LoginSystem backed by a persistent DigestIndex keeps its accounts across restarts, and that lookups
+    see both merged and still-buffered accounts.
+    """
+    path = str(tmp_path / 'accounts.idx')
+    system = LoginSystem(index_path=path)
+    system.hash_map.merge_threshold = 3
+    for i in range(10):
+        system.create_new_account(f'user{i}', f'password{i}')
+    system.create_new_account('user3', 'changed')
+    assert len(system.hash_map.write_buffer) < 3
+    assert len(system.hash_map) == 10
+    assert system.validate_password('user3', 'changed')
+    assert not system.check_existing_username('user10')
+    system.close()
+
+    system = LoginSystem(index_path=path)
+    assert list(system.hash_map) == sorted(f'user{i}' for i in range(10))
+    assert system.validate_password('user7', 'password7')
+    assert system.validate_password('user3', 'changed')
+    assert system.get_username_and_hash_pair('user0') == ('user0', hash_main.hash('password0'))
+    assert not system.is_empty()
+    system.close()
+
+    with DigestIndex(path) as index:
+        with pytest.raises(ValueError):
+            index['x' * 33] = hash_main.hash('')
+
+
+def test_bulk_account_import(tmp_path):
+    """
+    Test that accounts are bulk imported from CSV and JSONL streams, and that an import with a duplicate username is
+    rejected before anything is inserted.
+    """
+    csv_path = tmp_path / 'accounts.csv'
+    csv_path.write_text('username,password\n' + ''.join(f'user{i},pass{i}\n' for i in range(50)))
+    jsonl_path = tmp_path / 'accounts.jsonl'
+    jsonl_path.write_text('{"username": "extra", "password": "p, with comma"}\n\n')
+
+    system = LoginSystem()
+    reports = []
+    with open(csv_path, newline='') as file:
+        count, _ = account_import.import_accounts(system, account_import.read_csv_accounts(file),
+                                                  lambda *report: reports.append(report), report_every=20)
+    assert count == 50
+    assert [report[:2] for report in reports] == [(20, 50), (40, 50), (50, 50)]
+    assert system.validate_password('user42', 'pass42')
+
+    with open(jsonl_path) as file:
+        account_import.import_accounts(system, account_import.read_jsonl_accounts(file))
+    assert system.validate_password('extra', 'p, with comma')
+
+    with pytest.raises(ValueError):
+        account_import.import_accounts(system, [('new', 'a'), ('user1', 'b')])
+    assert not system.check_existing_username('new')
+    with pytest.raises(ValueError):
+        account_import.import_accounts(system, [('new', 'a')], report_every=0)
+
+    index_path = str(tmp_path / 'accounts.idx')
+    assert account_import.main([str(csv_path), index_path]) == 0
+    assert account_import.main([str(jsonl_path), index_path]) == 0
+    assert account_import.main([str(jsonl_path), index_path]) == 1
+    system = LoginSystem(index_path=index_path)
+    assert len(system.hash_map) == 51 and system.validate_password('user0', 'pass0')
+    system.close()
+
+
+def test_async_login_system():
+    """
+    Test that the asyncio login system hashes off the event loop, and that identical concurrent requests share one
+    hash job.
+    """
+    submitted = []
+
+    class CountingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(args)
+            return super().submit(fn, *args, **kwargs)
+
+    async def run() -> None:
+        with CountingExecutor(max_workers=2) as executor:
+            system = AsyncLoginSystem(executor=executor, max_in_flight=2)
+            await asyncio.gather(system.create_new_account('guest', 'abc'),
+                                 system.create_new_account('guest2', 'a'))
+            results = await asyncio.gather(*[system.validate_password('guest', 'abc') for _ in range(10)],
+                                           system.validate_password('guest2', 'abc'))
+            assert results == [True] * 10 + [False]
+            assert system.check_existing_username('guest2')
+            assert system.system.get_username_and_hash_pair('guest') == ('guest', hash_main.hash('abc'))
+            assert system._pending == {}
+
+    asyncio.run(run())
+    # One job for each account creation, then a single shared job for the 11 concurrent validations of 'abc'
+    assert submitted == [('abc',), ('a',), ('abc',)]
+
+
+def test_login_service():
+    """
+    Test the TCP login service protocol, and that the load generator drives it without errors.
+    """
+    async def run() -> None:
+        server = await LoginService().start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            responses = []
+            for request in ['CREATE guest a pass phrase', 'CREATE guest other', 'VALIDATE guest a pass phrase',
+                            'VALIDATE guest wrong', 'VALIDATE nobody x', 'LOOKUP guest', 'LOOKUP', 'DELETE guest']:
+                writer.write(request.encode('utf-8') + b'\n')
+                responses.append((await reader.readline()).decode('utf-8').rstrip('\n'))
+            writer.close()
+            await writer.wait_closed()
+
+            assert responses == ['OK', 'ERR exists', 'OK true', 'OK false', 'ERR no-such-user',
+                                 'OK ' + hash_main.hash('a pass phrase'), 'ERR bad-request', 'ERR bad-request']
+
+            report = await load_generator.run_load('127.0.0.1', port, connections=5, requests_per_connection=4)
+            assert report['requests'] == 20 and report['errors'] == 0
+            assert 0 < report['p50_ms'] <= report['p99_ms']
+
+    asyncio.run(run())
+
+
+def test_login_service_concurrent_create():
+    """
+    Test that concurrent CREATE requests for the same username create it exactly once and never overwrite it.
+    """
+    async def run() -> None:
+        service = LoginService()
+        responses = await asyncio.gather(service.handle_request('CREATE bob secret1'),
+                                         service.handle_request('CREATE bob attacker'))
+        assert sorted(responses) == ['ERR exists', 'OK']
+        winner = 'secret1' if responses[0] == 'OK' else 'attacker'
+        assert await service.handle_request(f'VALIDATE bob {winner}') == 'OK true'
+
+    asyncio.run(run())
+
+
+def test_login_service_rejects_unencodable_requests():
+    """
+    Test that a request the login system cannot take gets "ERR bad-request" and that the connection keeps answering
+    the requests pipelined after it.
+    """
+    async def run() -> None:
+        server = await LoginService().start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write('CREATE bob pässword\nCREATE bob password\nVALIDATE bob password\n'.encode('utf-8'))
+            responses = [(await reader.readline()).decode('utf-8').rstrip('\n') for _ in range(3)]
+            writer.close()
+            await writer.wait_closed()
+            assert responses == ['ERR bad-request', 'OK', 'OK true']
+
+    asyncio.run(run())
+
+
+def test_benchmarks(tmp_path, capsys):
+    """
+    Test that the benchmark suite writes machine-readable results and flags regressions against a baseline.
+    """
+    output = tmp_path / 'results.json'
+    assert benchmarks.main(['--max-size', '1000', '--min-time', '0', '--accounts', '5', '--output', str(output)]) == 0
+    results = json.loads(output.read_text())
+    names = [result['name'] for result in results]
+    assert names == [f'hash_latency_{bits}_bits' for bits in benchmarks.BOUNDARY_BITS] + \
+        ['throughput_1KB', 'login_create', 'login_validate']
+
+    # A baseline 10 times faster than every result makes them all regressions
+    for result in results:
+        result['value'] = result['value'] / 10 if not result['higher_is_better'] else result['value'] * 10
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(results))
+    assert benchmarks.main(['--max-size', '1000', '--min-time', '0', '--accounts', '5',
+                            '--baseline', str(baseline)]) == 1
+    assert capsys.readouterr().err.count('REGRESSION') == len(results)
+
+
+def test_instrumentation():
+    """
+    Test that per-stage timings are only recorded while instrumentation is enabled, and that instrumented hashes are
+    unchanged.
+    """
+    instrumentation.reset()
+    hash_main.hash('abc')
+    assert instrumentation.get_stats() == {}
+
+    instrumentation.enable()
+    try:
+        assert hash_main.hash('abc') == '900150983cd24fb0d6963f7d28e17f72'
+        assert hash_main.hash('a' * 130) == hashlib.md5(b'a' * 130).hexdigest()
+    finally:
+        instrumentation.disable()
+
+    stats = instrumentation.get_stats()
+    assert list(stats) == ['encode', 'blocks', 'm_values', 'compress', 'format', 'total']
+    assert stats['total']['calls'] == 2 and stats['compress']['calls'] == 1 + 3
+    assert all(stat['seconds'] >= 0 for stat in stats.values())
+    assert 'compress' in instrumentation.report()
+    instrumentation.reset()
+
+
+def test_password_audit(tmp_path):
+    """
+    Test that the wordlist audit flags every account whose password is in the wordlist, and that an interrupted audit
+    resumes from its checkpoint.
+    """
+    system = LoginSystem()
+    system.create_new_account('alice', 'letmein')
+    system.create_new_account('bob', 'letmein')
+    system.create_new_account('carol', 'correct horse battery staple')
+    system.create_new_account('dave', 'qwerty')
+
+    wordlist = tmp_path / 'wordlist.txt'
+    wordlist.write_bytes(b'123456\npassword\nletmein\n\xff\xfe\nqwerty\r\ndragon\n')
+    expected = {'alice', 'bob', 'dave'}
+    assert password_audit.audit_wordlist(system, str(wordlist)) == expected
+    assert password_audit.audit_wordlist(system, str(wordlist), reveal_passwords=True) == \
+        {'alice': 'letmein', 'bob': 'letmein', 'dave': 'qwerty'}
+
+    checkpoint = str(tmp_path / 'audit.json')
+
+    def interrupt(checked: int, elapsed: float) -> None:
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        password_audit.audit_wordlist(system, str(wordlist), checkpoint, batch_size=3, progress=interrupt)
+    with open(checkpoint) as file:
+        saved = json.load(file)
+    assert saved['checked'] == 3 and saved['flagged'] == ['alice', 'bob']
+    assert 'letmein' not in open(checkpoint).read()
+    assert os.stat(checkpoint).st_mode & 0o777 == 0o600
+
+    checked = []
+    found = password_audit.audit_wordlist(system, str(wordlist), checkpoint, batch_size=3,
+                                          progress=lambda count, elapsed: checked.append(count))
+    assert found == expected
+    assert checked == [5]
+
+
+def test_keyspace_search(tmp_path):
+    """
+    Test that the keyspace search finds candidates for every target across ranges and workers, and that a search
+    resumes from its checkpoint.
+    """
+    keyspaces = keyspace_search.keyspaces_from_charset('abz1', 1, 4)
+    targets = [hash_main.hash('z1a'), hash_main.hash('b'), hash_main.hash('notinkeyspace')]
+
+    found = keyspace_search.search(targets, keyspaces, range_size=10, workers=2)
+    assert found == {targets[0]: 'z1a', targets[1]: 'b'}
+
+    mask = keyspace_search.keyspace_from_mask('?u?d')
+    assert mask.size == 260 and mask.candidate(259) == 'Z9'
+    assert keyspace_search.search([hash_main.hash('Q7')], [mask], range_size=50, workers=1) == \
+        {hash_main.hash('Q7'): 'Q7'}
+
+    checkpoint = str(tmp_path / 'search.json')
+    assert keyspace_search.search(targets, keyspaces, range_size=100, workers=1, checkpoint_path=checkpoint) == found
+    with open(checkpoint) as file:
+        saved = json.load(file)
+    assert saved['low_water'] == len(list(keyspace_search.split_ranges(keyspaces, 100))) and saved['done_above'] == []
+    assert saved['found'] == sorted(found) and 'z1a' not in open(checkpoint).read()
+    assert os.stat(checkpoint).st_mode & 0o777 == 0o600
+    # Every range is finished, so the resumed search only reports the targets the checkpoint already holds
+    assert keyspace_search.search(targets, keyspaces, range_size=100, workers=1, checkpoint_path=checkpoint) == \
+        dict.fromkeys(found)
+    with pytest.raises(ValueError):
+        keyspace_search.search(targets, keyspaces, range_size=50, checkpoint_path=checkpoint)
+
+    # Range 0 (length 1, holding 'b') is below the low-water mark and range 2 (length 3, holding 'z1a') is finished
+    json_files.write_json_atomically(checkpoint, {'keyspaces': saved['keyspaces'], 'range_size': 100,
+                                                  'low_water': 1, 'done_above': [2], 'found': []})
+    assert keyspace_search.search(targets, keyspaces, range_size=100, workers=1, checkpoint_path=checkpoint) == {}
+    with open(checkpoint) as file:
+        saved = json.load(file)
+    assert saved['low_water'] == 6 and saved['done_above'] == []
+
+
+def test_candidate_block():
+    """
+    Test that patching single bytes of a CandidateBlock gives the same hashes as hashing each candidate from scratch.
+    """
+    block = CandidateBlock(6)
+    block.set_bytes(b'pass00')
+    for last_two in ['00', '01', '09', '10', '99']:
+        block.set_byte(4, ord(last_two[0]))
+        block.set_byte(5, ord(last_two[1]))
+        state = hash_main.compress(hash_main.INITIAL_VECTORS, block.m_values)
+        assert hash_main._format_digest(state) == hash_main.hash('pass' + last_two)
+
+    with pytest.raises(ValueError):
+        CandidateBlock(56)
+    with pytest.raises(ValueError):
+        block.set_bytes(b'short')
+    for value in [-1, 256, ord('ā')]:
+        with pytest.raises(ValueError):
+            block.set_byte(5, value)
+
+    # Non-ASCII candidates would be hashed as Latin-1 in one block but rejected in longer ones
+    with pytest.raises(ValueError):
+        keyspace_search.Keyspace(['é'])
+    with pytest.raises(ValueError):
+        keyspace_search.keyspace_from_mask('?dé')
+
+
+def test_compact_digest_store():
+    """
+    Test that a LoginSystem backed by a CompactDigestStore keeps every digest in one contiguous buffer and validates
+    passwords the same way as the default dict.
+    """
+    system = LoginSystem(compact=True)
+    assert isinstance(system.hash_map, CompactDigestStore) and system.is_empty()
+
+    system.create_new_account('guest', 'abc')
+    system.create_new_account('guest2', 'a')
+    system.create_new_account('guest', 'changed')
+    assert len(system.hash_map) == 2 and len(system.hash_map.digests) == 32
+    assert system.validate_password('guest', 'changed')
+    assert not system.validate_password('guest', 'abc')
+    assert system.validate_password('guest2', 'a')
+    assert system.get_username_and_hash_pair('guest2') == ('guest2', hash_main.hash('a'))
+    assert [(record.username, record.digest.hex()) for record in system.hash_map.records()] == \
+        [('guest', hash_main.hash('changed')), ('guest2', hash_main.hash('a'))]
+
+    with pytest.raises(KeyError):
+        system.validate_password('nobody', 'a')
+    with pytest.raises(ValueError):
+        system.hash_map.set_digest('guest3', b'short')
+
+    # Every account lives in the flat buffers, which stay a few dozen bytes per account as the table grows
+    store = CompactDigestStore()
+    store.update((f'user{i}', hashlib.md5(str(i).encode()).hexdigest()) for i in range(5000))
+    assert all(store[f'user{i}'] == hashlib.md5(str(i).encode()).hexdigest() for i in range(5000))
+    assert 'user5000' not in store and list(store)[:2] == ['user0', 'user1']
+    buffer_bytes = len(store.names) + len(store.digests) + store.name_ends.itemsize * len(store.name_ends) + \
+        store.table.itemsize * len(store.table)
+    assert buffer_bytes / len(store) < 48
+
+
+def test_journaled_login_system(tmp_path):
+    """
+    Test that a journaled LoginSystem recovers its accounts from the snapshot plus the journal tail, and discards a
+    torn record at the end of the journal.
+    """
+    directory = str(tmp_path / 'accounts')
+    system = LoginSystem(journal_dir=directory)
+    system.hash_map.snapshot_every = 4
+    for i in range(6):
+        system.create_new_account(f'user{i}', f'password{i}')
+    system.create_new_account('user1', 'changed')
+
+    # The snapshot after the fourth record emptied the journal, which now only holds the three records since
+    journal_path = tmp_path / 'accounts' / journal.JOURNAL_FILE
+    record_sizes = [len(journal._encode_record(username, bytes(16))) for username in ['user4', 'user5', 'user1']]
+    assert os.path.getsize(journal_path) == sum(record_sizes)
+    system.close()
+
+    # Simulate a crash in the middle of appending a record
+    with open(journal_path, 'ab') as file:
+        file.write(journal._encode_record('torn', bytes(16))[:-3])
+
+    system = LoginSystem(journal_dir=directory)
+    assert len(system.hash_map) == 6 and not system.check_existing_username('torn')
+    assert system.validate_password('user5', 'password5')
+    assert system.validate_password('user1', 'changed')
+    system.create_new_account('user6', 'password6')
+    system.close()
+
+    system = LoginSystem(journal_dir=directory)
+    assert system.validate_password('user6', 'password6') and len(system.hash_map) == 7
+
+    # A crash after the snapshot is replaced but before the journal is emptied replays records it already holds
+    system.create_new_account('user6', 'changed')
+    system.hash_map.flush()
+    old_journal = journal_path.read_bytes()
+    system.hash_map.snapshot()
+    system.close()
+    journal_path.write_bytes(old_journal)
+    system = LoginSystem(journal_dir=directory)
+    assert system.validate_password('user6', 'changed') and len(system.hash_map) == 7
+    system.close()
+
+
+def test_journal_durability(tmp_path):
+    """
+    Test that every journal record reaches the OS as soon as it is stored, and that pending records are fsynced by
+    the background timer after sync_interval even if nothing else is appended.
+    """
+    store = journal.JournaledDigestStore(tmp_path / 'accounts', sync_every=1000, sync_interval=0.05)
+    journal_path = tmp_path / 'accounts' / journal.JOURNAL_FILE
+    store['bob'] = hash_main.hash('abc')
+    assert os.path.getsize(journal_path) == len(journal._encode_record('bob', bytes(16)))
+    assert store._pending == 1
+
+    time.sleep(0.3)
+    assert store._pending == 0 and store._timer is None
+    store.close()
+
+
+def test_sharded_login_system():
+    """
+    Test that the sharded login system routes every username to a stable shard and that batch calls return results
+    in input order.
+    """
+    with ShardedLoginSystem(shard_count=3) as system:
+        assert system.shard_for('guest') == system.shard_for('guest')
+
+        accounts = [(f'user{i}', f'password{i}') for i in range(30)]
+        system.create_many(accounts)
+        system.create_new_account('guest', 'abc')
+        assert len(system) == 31
+        assert len({system.shard_for(username) for username, _ in accounts}) == 3
+
+        attempts = [(username, password if i % 3 else 'wrong') for i, (username, password) in enumerate(accounts)]
+        assert system.validate_many(attempts) == [i % 3 != 0 for i in range(30)]
+        assert system.validate_password('guest', 'abc')
+        assert not system.validate_password('guest', 'ab')
+        assert system.check_existing_username('user7') and not system.check_existing_username('user30')
+        assert system.get_username_and_hash_pair('guest') == ('guest', hash_main.hash('abc'))
+
+        with pytest.raises(KeyError):
+            system.validate_password('nobody', 'abc')
+
+
+def test_tree_hash(tmp_path):
+    """
+    Test the tree-hash root against the documented format built with hashlib, in the calling process, on the pool and
+    from a file.
+    """
+    def md5(data):
+        return hashlib.md5(data).digest()
+
+    data = bytes(range(256)) + b'tail'
+    leaves = [md5(b'\x00' + data[i:i + 64]) for i in range(0, len(data), 64)]
+    level = [md5(b'\x01' + leaves[0] + leaves[1]), md5(b'\x01' + leaves[2] + leaves[3]), leaves[4]]
+    expected = md5(b'\x01' + md5(b'\x01' + level[0] + level[1]) + level[2]).hex()
+
+    assert tree_hash(data, leaf_size=64) == expected
+    assert tree_hash(data, leaf_size=64, serial_threshold=1) == expected
+    assert tree_hash(b'') == md5(b'\x00').hex()
+
+    path = tmp_path / 'artifact.bin'
+    path.write_bytes(data)
+    assert tree_hash_file(path, leaf_size=64, serial_threshold=1) == expected
+    assert tree_hash_file(path) == tree_hash(data) == md5(b'\x00' + data).hex()
+
+    with pytest.raises(ValueError):
+        tree_hash(data, leaf_size=100)
+
+
+def test_directory_manifest(tmp_path, monkeypatch, capsys):
+    """
+    Test that manifests match hashlib, that the cache skips unchanged files and that verification reports every
+    difference.
+    """
+    root = tmp_path / 'store'
+    (root / 'nested').mkdir(parents=True)
+    (root / 'a.bin').write_bytes(b'a')
+    (root / 'nested' / 'b.bin').write_bytes(b'b' * 100)
+    cache_path = str(tmp_path / 'cache.json')
+    manifest_path = str(tmp_path / 'MANIFEST')
+
+    built = manifest.build_manifest(root, cache_path, serial_threshold=1)
+    assert built == {'a.bin': hashlib.md5(b'a').hexdigest(), 'nested/b.bin': hashlib.md5(b'b' * 100).hexdigest()}
+    manifest.write_manifest(built, manifest_path)
+    assert manifest.read_manifest(manifest_path) == built
+
+    hashed = []
+    monkeypatch.setattr(manifest, 'hash_file', lambda path: hashed.append(path) or file_hashing.hash_file(path))
+    (root / 'c.bin').write_bytes(b'c')
+    assert manifest.build_manifest(root, cache_path)['c.bin'] == hashlib.md5(b'c').hexdigest()
+    assert hashed == [str(root / 'c.bin')]
+
+    (root / 'a.bin').write_bytes(b'changed')
+    (root / 'nested' / 'b.bin').unlink()
+    assert manifest.verify_manifest(root, built) == {'mismatched': ['a.bin'], 'missing': ['nested/b.bin'],
+                                                      'added': ['c.bin']}
+    assert manifest.main([str(root), manifest_path, '--verify']) == 1
+    assert 'MISMATCHED: a.bin' in capsys.readouterr().out
+
+
+def test_hmac_md5():
+    """
+    Test HMAC-MD5 against the standard library for short, block-sized and over-long keys and messages, and that
+    verify_many rejects wrong signatures.
+    """
+    for key in [b'', b'key', b'k' * 64, b'k' * 100]:
+        for message in [b'', b'token', b'm' * 55, b'm' * 64, b'm' * 200]:
+            assert hmac_md5(key, message) == hmac.new(key, message, hashlib.md5).hexdigest()
+
+    key = HMACKey('secret')
+    tokens = [f'token{i}' for i in range(10)]
+    signatures = [hmac.new(b'secret', token.encode(), hashlib.md5).hexdigest() for token in tokens]
+    signatures[3] = signatures[4]
+    signatures[5] = bytes.fromhex(signatures[5])
+    assert key.verify_many(zip(tokens, signatures)) == [i != 3 for i in range(10)]
+
+
+def test_salted_password_hashing():
+    """
+    Test the salted, iterated scheme against hashlib's PBKDF2-HMAC-MD5, its stored format, calibration, and that a
+    salted LoginSystem still verifies (and upgrades) old unsalted hashes.
+    """
+    salt = bytes.fromhex('73616c74')
+    stored = password_hashing.hash_password('abc', 50, salt)
+    assert stored == 'pbkdf2-md5$50$73616c74$' + hashlib.pbkdf2_hmac('md5', b'abc', salt, 50).hex()
+    assert password_hashing.verify_password('abc', stored) and not password_hashing.verify_password('abd', stored)
+    assert password_hashing.verify_password('abc', hash_main.hash('abc'))
+    assert password_hashing.hash_password('abc') != password_hashing.hash_password('abc')
+    assert password_hashing.needs_rehash(stored, 100) and not password_hashing.needs_rehash(stored, 50)
+    assert password_hashing.calibrate(0.01, 0.001) >= 1
+    with pytest.raises(ValueError):
+        password_hashing.verify_password('abc', 'sha1$1$00$00')
+
+    system = LoginSystem(iterations=20)
+    system.create_new_account('guest', 'abc')
+    assert system.hash_map['guest'].startswith('pbkdf2-md5$20$')
+    assert system.validate_password('guest', 'abc') and not system.validate_password('guest', 'ab')
+
+    system.hash_map['legacy'] = hash_main.hash('a')
+    assert not system.validate_password('legacy', 'b')
+    assert system.hash_map['legacy'] == hash_main.hash('a')
+    assert system.validate_password('legacy', 'a')
+    assert system.hash_map['legacy'].startswith('pbkdf2-md5$20$') and system.validate_password('legacy', 'a')
+
+    with pytest.raises(ValueError):
+        LoginSystem(compact=True, iterations=20)
+
+
+def test_salted_async_login_system():
+    """
+    Test that the asynchronous front end and the TCP service create and verify salted passwords, and upgrade old
+    unsalted hashes on login.
+    """
+    async def run() -> None:
+        system = LoginSystem(iterations=20)
+        async_system = AsyncLoginSystem(system)
+        await async_system.create_new_account('bob', 'pw')
+        assert system.hash_map['bob'].startswith('pbkdf2-md5$20$')
+        assert await async_system.validate_password('bob', 'pw')
+        assert not await async_system.validate_password('bob', 'wrong')
+
+        system.hash_map['legacy'] = hash_main.hash('a')
+        assert await async_system.validate_password('legacy', 'a')
+        assert system.hash_map['legacy'].startswith('pbkdf2-md5$20$') and system.validate_password('legacy', 'a')
+
+        service = LoginService(async_system)
+        assert await service.handle_request('CREATE carol secret') == 'OK'
+        assert system.hash_map['carol'].startswith('pbkdf2-md5$20$')
+        assert await service.handle_request('VALIDATE carol secret') == 'OK true'
+
+    asyncio.run(run())
+
+
+def test_salted_import_and_audit(tmp_path):
+    """
+    Test that bulk imports into a salted LoginSystem store salted passwords, and that wordlist audits reject it
+    instead of silently flagging nothing.
+    """
+    system = LoginSystem(iterations=20)
+    account_import.import_accounts(system, [('alice', 'letmein'), ('bob', 'qwerty')])
+    assert all(system.hash_map[username].startswith('pbkdf2-md5$20$') for username in ['alice', 'bob'])
+    assert system.validate_password('alice', 'letmein') and system.validate_password('bob', 'qwerty')
+
+    wordlist = tmp_path / 'wordlist.txt'
+    wordlist.write_text('letmein\n')
+    with pytest.raises(ValueError):
+        password_audit.audit_wordlist(system, str(wordlist))
+
+
+def test_salted_journaled_login_system(tmp_path, capsys):
+    """
+    Test that a salted LoginSystem persists its accounts in a journal_dir, through both journal replay and snapshots,
+    that sharded systems store salted passwords, and that print_database widens its HASH column for them.
+    """
+    system = LoginSystem(journal_dir=str(tmp_path), iterations=20)
+    system.create_new_account('guest', 'abc')
+    system.hash_map['legacy'] = hash_main.hash('a')
+    assert system.validate_password('legacy', 'a') and system.hash_map['legacy'].startswith('pbkdf2-md5$20$')
+    assert len(system.hash_map) == 2 and system.hash_map.get_digest('legacy') is None
+    assert list(system.hash_map.records()) == []
+    system.close()
+
+    system = LoginSystem(journal_dir=str(tmp_path), iterations=20)
+    assert list(system.hash_map) == ['legacy', 'guest']
+    assert system.validate_password('guest', 'abc') and system.validate_password('legacy', 'a')
+    system.hash_map['digest'] = hash_main.hash('b')
+    system.hash_map.snapshot()
+    system.close()
+
+    system = LoginSystem(journal_dir=str(tmp_path), iterations=20)
+    assert len(system.hash_map) == 3 and system.hash_map['digest'] == hash_main.hash('b')
+    assert system.validate_password('guest', 'abc') and system.validate_password('legacy', 'a')
+
+    capsys.readouterr()
+    system.print_database()
+    lines = capsys.readouterr().out.splitlines()
+    assert len({len(line) for line in lines}) == 1 and len(lines[0]) == 39 + len(system.hash_map['guest'])
+    system.close()
+
+    with ShardedLoginSystem(2, iterations=20) as sharded_system:
+        sharded_system.create_new_account('guest', 'abc')
+        assert sharded_system.get_username_and_hash_pair('guest')[1].startswith('pbkdf2-md5$20$')
+        assert sharded_system.validate_password('guest', 'abc')
+
+
 pytest.main(["test_vowels.py"])
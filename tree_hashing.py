@@ -0,0 +1,127 @@
+import os
+from collections import deque
+from concurrent.futures import Future
+from typing import Iterable, Iterator
+
+from batch_hashing import get_pool
+from hasher import MD5Hasher
+
+"""
+Merkle tree-hash mode built on the MD5 core, for verifying the content of very large artifacts on every core.
+
+This is NOT MD5 and its root never matches a plain MD5 hash of the same input. The format is:
+
+    1. The input is split into leaves of leaf_size bytes (DEFAULT_LEAF_SIZE, 1 MiB, unless chosen otherwise); the last
+       leaf may be shorter. An empty input is a single empty leaf.
+    2. The digest of a leaf is MD5(0x00 || leaf).
+    3. The digests of one level are paired from the left and the digest of a pair is MD5(0x01 || left || right).
+       An unpaired last digest is promoted to the next level unchanged.
+    4. The root is the single digest left, written as 32 hexadecimal characters.
+
+The 0x00 / 0x01 prefixes keep a leaf from ever being confused with an inner node. The root depends on leaf_size, so
+the same leaf size has to be used to produce and to verify it.
+"""
+
+# Size of every leaf but the last (a multiple of 64 bytes so that leaves never share a block)
+DEFAULT_LEAF_SIZE = 1024 * 1024
+
+# Inputs with fewer leaves than this are hashed in the calling process, where pool overhead would dominate
+DEFAULT_SERIAL_THRESHOLD = 4
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def tree_hash(data: bytes | bytearray | memoryview, leaf_size: int = DEFAULT_LEAF_SIZE,
+              serial_threshold: int = DEFAULT_SERIAL_THRESHOLD) -> str:
+    """
+    Returns the tree-hash root of <data> (see the module docstring), hashing its leaves in parallel on the shared
+    process pool.
+
+    >>> tree_hash(b'abc') == leaf_digest(b'abc').hex()
+    True
+    """
+    _check_leaf_size(leaf_size)
+    view = memoryview(data).cast('B')
+    leaves = [view[offset:offset + leaf_size] for offset in range(0, len(view), leaf_size)] or [view]
+    if len(leaves) < serial_threshold:
+        return combine(leaf_digest(leaf) for leaf in leaves).hex()
+    return combine(_map_in_pool(leaf_digest, ((bytes(leaf),) for leaf in leaves))).hex()
+
+
+def tree_hash_file(path: str | os.PathLike, leaf_size: int = DEFAULT_LEAF_SIZE,
+                   serial_threshold: int = DEFAULT_SERIAL_THRESHOLD) -> str:
+    """
+    Returns the tree-hash root of the contents of the file at <path>. Every worker reads its own leaves from the
+    file, so no leaf is ever copied between processes.
+    """
+    _check_leaf_size(leaf_size)
+    path = os.fspath(path)
+    size = os.path.getsize(path)
+    offsets = range(0, size, leaf_size) if size else [0]
+    if len(offsets) < serial_threshold:
+        return combine(_hash_file_leaf(path, offset, leaf_size) for offset in offsets).hex()
+    return combine(_map_in_pool(_hash_file_leaf, ((path, offset, leaf_size) for offset in offsets))).hex()
+
+
+def leaf_digest(leaf: bytes | bytearray | memoryview) -> bytes:
+    """
+    Returns the raw 16-byte digest of one leaf.
+    """
+    hasher = MD5Hasher(LEAF_PREFIX)
+    hasher.update(leaf)
+    return hasher.digest()
+
+
+def node_digest(left: bytes, right: bytes) -> bytes:
+    """
+    Returns the raw 16-byte digest of the inner node whose children have the digests <left> and <right>.
+    """
+    return MD5Hasher(NODE_PREFIX + left + right).digest()
+
+
+def combine(digests: Iterable[bytes]) -> bytes:
+    """
+    Combines the leaf <digests>, in order, up the binary tree and returns the raw 16-byte root.
+    """
+    level = list(digests)
+    while len(level) > 1:
+        next_level = [node_digest(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+    return level[0]
+
+
+def _check_leaf_size(leaf_size: int) -> None:
+    """
+    Raises a ValueError if <leaf_size> is not a positive multiple of 64 bytes.
+    """
+    if leaf_size <= 0 or leaf_size % 64:
+        raise ValueError('The leaf size must be a positive multiple of 64 bytes')
+
+
+def _map_in_pool(function, arguments: Iterator[tuple]) -> Iterator[bytes]:
+    """
+    Yields <function> applied to every tuple of <arguments> on the shared process pool, in order, with a bounded
+    number of calls in flight.
+    """
+    pool = get_pool()
+    max_in_flight = 2 * (os.cpu_count() or 1)
+    in_flight: deque[Future] = deque()
+    for argument in arguments:
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.popleft().result()
+        in_flight.append(pool.submit(function, *argument))
+
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+def _hash_file_leaf(path: str, offset: int, leaf_size: int) -> bytes:
+    """
+    Returns the digest of the leaf starting at <offset> in the file at <path>. Runs inside a worker process.
+    """
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        return leaf_digest(file.read(leaf_size))